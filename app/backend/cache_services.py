@@ -0,0 +1,135 @@
+import os
+import time
+import asyncio
+import functools
+import hashlib
+import sqlite3
+import contextlib
+from typing import NamedTuple, Optional
+
+from utils import APPLICATIONS_DIR
+
+# --- Constants ---
+# Lives next to the application folders so it survives container rebuilds.
+CACHE_PATH = os.path.join(APPLICATIONS_DIR, ".llm_cache.sqlite")
+# Seconds a cached LLM response stays valid; 0 disables the cache.
+CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# Optional second tier that also matches near-identical job descriptions by embedding.
+# Off by default since it needs sentence-transformers and a model download.
+SEMANTIC_CACHE_ENABLED = os.getenv("LLM_SEMANTIC_CACHE", "").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_MODEL = os.getenv("LLM_SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.97"))
+
+class CacheKey(NamedTuple):
+    exact: str # Hash of every input
+    namespace: str # Hash of every input except the job description
+    jd_text: str # Compared by embedding within the namespace for the semantic tier
+
+# --- Helper Functions ---
+def make_cache_key(*parts: str) -> str:
+    """Hashes the agent name, provider and every prompt input into a single key."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def make_agent_cache_key(agent: str, model_provider: str, jd_text: str, *inputs: str) -> CacheKey:
+    """Builds the exact and semantic cache keys for one agent call."""
+    return CacheKey(
+        exact=make_cache_key(agent, model_provider, jd_text, *inputs),
+        namespace=make_cache_key(agent, model_provider, *inputs),
+        jd_text=jd_text,
+    )
+
+@contextlib.contextmanager
+def _connect():
+    """Yields a connection inside a transaction and always closes it afterwards."""
+    with contextlib.closing(sqlite3.connect(CACHE_PATH)) as conn, conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS similar_responses (namespace TEXT NOT NULL, embedding BLOB NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS similar_responses_namespace ON similar_responses (namespace)")
+        yield conn
+
+def _read(key: str) -> Optional[str]:
+    with _connect() as conn:
+        row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+    if row is None or row[1] < time.time():
+        return None
+    return row[0]
+
+def _write(key: str, value: str):
+    now = time.time()
+    with _connect() as conn:
+        # Expired rows are never read again, so each write sweeps them out.
+        conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + CACHE_TTL_SECONDS)
+        )
+
+@functools.lru_cache(maxsize=1)
+def _embedding_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(SEMANTIC_CACHE_MODEL)
+
+def _embed(text: str):
+    return _embedding_model().encode(text, normalize_embeddings=True).astype("float32")
+
+def _read_similar(namespace: str, text: str) -> Optional[str]:
+    """Flat cosine search over the namespace's stored embeddings; there are only ever a handful per namespace."""
+    import numpy as np
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT embedding, value FROM similar_responses WHERE namespace = ? AND expires_at >= ?", (namespace, time.time())
+        ).fetchall()
+    if not rows:
+        return None
+    scores = np.stack([np.frombuffer(row[0], dtype="float32") for row in rows]) @ _embed(text)
+    best = int(scores.argmax())
+    return rows[best][1] if scores[best] >= SEMANTIC_CACHE_THRESHOLD else None
+
+def _write_similar(namespace: str, text: str, value: str):
+    """Stores the response, replacing any near-duplicate entries so each namespace stays small."""
+    import numpy as np
+    embedding = _embed(text)
+    now = time.time()
+    with _connect() as conn:
+        conn.execute("DELETE FROM similar_responses WHERE expires_at < ?", (now,))
+        rows = conn.execute("SELECT rowid, embedding FROM similar_responses WHERE namespace = ?", (namespace,)).fetchall()
+        if rows:
+            scores = np.stack([np.frombuffer(row[1], dtype="float32") for row in rows]) @ embedding
+            duplicates = [(row[0],) for row, score in zip(rows, scores) if score >= SEMANTIC_CACHE_THRESHOLD]
+            conn.executemany("DELETE FROM similar_responses WHERE rowid = ?", duplicates)
+        conn.execute(
+            "INSERT INTO similar_responses (namespace, embedding, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, embedding.tobytes(), value, now + CACHE_TTL_SECONDS)
+        )
+
+async def get_cached_response(key: CacheKey) -> Optional[str]:
+    """Returns the cached response for the key, or None on a miss or cache error."""
+    if CACHE_TTL_SECONDS <= 0:
+        return None
+    try:
+        cached = await asyncio.to_thread(_read, key.exact)
+    except sqlite3.Error as e:
+        print(f"LLM cache read failed: {e}")
+        return None
+    if cached is None and SEMANTIC_CACHE_ENABLED:
+        # The semantic tier is best-effort: a missing package, failed model download
+        # or corrupt embedding is just a miss.
+        try:
+            cached = await asyncio.to_thread(_read_similar, key.namespace, key.jd_text)
+        except Exception as e:
+            print(f"LLM semantic cache read failed: {e}")
+    return cached
+
+async def set_cached_response(key: CacheKey, value: str):
+    """Stores a response; failures are logged and otherwise ignored."""
+    if CACHE_TTL_SECONDS <= 0:
+        return
+    try:
+        await asyncio.to_thread(_write, key.exact, value)
+    except sqlite3.Error as e:
+        print(f"LLM cache write failed: {e}")
+    if SEMANTIC_CACHE_ENABLED:
+        try:
+            await asyncio.to_thread(_write_similar, key.namespace, key.jd_text, value)
+        except Exception as e:
+            print(f"LLM semantic cache write failed: {e}")
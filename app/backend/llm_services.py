@@ -1,49 +1,349 @@
 import os
-import google.generativeai as genai
-from openai import OpenAI
+import re
+import sys
+import time
+import asyncio
+import functools
+import contextlib
+import httpx
+import tenacity
+from aiolimiter import AsyncLimiter
 import yaml
-import json
+import orjson
 from fastapi import HTTPException
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+from utils import YAML_LOADER, YAML_DUMPER
+from cache_services import CacheKey, make_cache_key, make_agent_cache_key, get_cached_response, set_cached_response
 
 # --- Configure the SDKs ---
+# The provider SDKs pull in grpc/protobuf and friends, so they are imported on
+# first use rather than at startup; a deployment that only talks to one
+# provider never loads the other.
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+
+@functools.lru_cache(maxsize=None)
+def _genai():
+    import google.generativeai as genai
+    if GEMINI_API_KEY:
+        genai.configure(api_key=GEMINI_API_KEY)
+    return genai
+
+# Optional comma-separated list of keys to spread requests across; defaults to GEMINI_API_KEY.
+GEMINI_API_KEYS = [key.strip() for key in os.getenv("GEMINI_API_KEYS", GEMINI_API_KEY or "").split(",") if key.strip()]
+# How long a key sits out of the rotation after a 429 that carries no retry delay (Gemini quotas are per minute).
+KEY_COOLDOWN_SECONDS = 60.0
 
 OPEN_ROUTER_KEY = os.getenv("OPEN_ROUTER_KEY")
+# Optional comma-separated list of OpenRouter keys, rotated the same way; defaults to OPEN_ROUTER_KEY.
+OPEN_ROUTER_KEYS = [key.strip() for key in os.getenv("OPEN_ROUTER_KEYS", OPEN_ROUTER_KEY or "").split(",") if key.strip()]
+
+# "httpx" (default, HTTP/2) or "aiohttp", which scales better for large batch runs.
+OPENROUTER_HTTP_BACKEND = os.getenv("OPENROUTER_HTTP_BACKEND", "httpx").lower()
+
+# --- Shared HTTP Clients ---
+# Built once so every OpenRouter call reuses pooled keep-alive connections
+# instead of paying a fresh TCP+TLS handshake per request. HTTP/2 lets
+# concurrent requests multiplex over a single connection.
+shared_limits = httpx.Limits(max_keepalive_connections=50, max_connections=100, keepalive_expiry=30.0)
+# A dead host fails within seconds, while a slow generation still gets two minutes
+# between bytes. No pool timeout: the in-flight semaphores already bound the queue.
+OPENROUTER_TIMEOUT = httpx.Timeout(connect=5.0, read=120.0, write=10.0, pool=None)
+
+def _build_openrouter_http_client():
+    """Returns the transport used underneath the OpenRouter client."""
+    if OPENROUTER_HTTP_BACKEND == "aiohttp":
+        from openai import DefaultAioHttpClient
+        return DefaultAioHttpClient()
+    return httpx.AsyncClient(http2=True, limits=shared_limits)
+
+_openrouter_clients: Dict[str, Any] = {}
+
+def _openrouter_client(api_key: Optional[str] = None):
+    """Builds the OpenRouter client for a key (the first one by default) on first use; None when no key is configured."""
+    api_key = api_key or (OPEN_ROUTER_KEYS[0] if OPEN_ROUTER_KEYS else None)
+    if not api_key:
+        return None
+    if api_key not in _openrouter_clients:
+        from openai import AsyncOpenAI
+        _openrouter_clients[api_key] = AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=api_key,
+            http_client=_build_openrouter_http_client(),
+            timeout=OPENROUTER_TIMEOUT,
+        )
+    return _openrouter_clients[api_key]
+
+# Streamed responses are flushed roughly every 50 tokens (~200 characters) or 200ms.
+STREAM_BATCH_CHARS = 200
+STREAM_FLUSH_SECONDS = 0.2
+
+# --- Concurrency Limits ---
+# Caps on simultaneous in-flight requests per provider; bursts queue here instead of tripping rate limits.
+GEMINI_MAX_INFLIGHT = int(os.getenv("GEMINI_MAX_INFLIGHT", "8"))
+OPENROUTER_MAX_INFLIGHT = int(os.getenv("OPENROUTER_MAX_INFLIGHT", "8"))
+
+_provider_limits = {"gemini": GEMINI_MAX_INFLIGHT, "openrouter": OPENROUTER_MAX_INFLIGHT}
+_provider_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def _provider_semaphore(provider: str) -> asyncio.Semaphore:
+    """Created on first use so the semaphore binds to the server's event loop rather than the import-time one."""
+    if provider not in _provider_semaphores:
+        _provider_semaphores[provider] = asyncio.Semaphore(_provider_limits[provider])
+    return _provider_semaphores[provider]
+
+@contextlib.asynccontextmanager
+async def _attempt_slot(provider: str, stream: bool):
+    """
+    Holds an in-flight slot for one attempt, so a retry's backoff sleep never keeps it.
+    Streams skip this; their caller holds a slot for as long as the connection stays open.
+    """
+    if stream:
+        yield
+        return
+    async with _provider_semaphore(provider):
+        yield
+
+# Requests-per-minute budgets, enforced as a token bucket so a burst of users
+# queues locally instead of tripping the provider's 429s. Gemini quotas apply
+# per key; 0 disables the limit.
+GEMINI_RPM_PER_KEY = int(os.getenv("GEMINI_RPM_PER_KEY", "60"))
+OPENROUTER_RPM = int(os.getenv("OPENROUTER_RPM", "0"))
+
+@functools.lru_cache(maxsize=None)
+def _rate_limiter(name: str, rpm: int) -> Optional[AsyncLimiter]:
+    """One limiter per key (or provider), created on first use."""
+    return AsyncLimiter(rpm, 60) if rpm > 0 else None
+
+@contextlib.asynccontextmanager
+async def _rate_limited(name: str, rpm: int):
+    limiter = _rate_limiter(name, rpm)
+    if limiter is None:
+        yield
+        return
+    async with limiter:
+        yield
+
+# Rate limits and transient server/connection errors are retried with jittered
+# exponential backoff; anything else (bad request, auth) fails straight through.
+def _is_transient_error(e: BaseException) -> bool:
+    # Only SDKs that are already loaded can have raised the error, so nothing is imported here.
+    google_exceptions = sys.modules.get("google.api_core.exceptions")
+    if google_exceptions and isinstance(e, (google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError)):
+        return True
+    openai = sys.modules.get("openai")
+    return bool(openai) and isinstance(e, (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError))
+
+_retry_on_transient_error = tenacity.retry(
+    retry=tenacity.retry_if_exception(_is_transient_error),
+    wait=tenacity.wait_random_exponential(multiplier=0.5, max=30),
+    stop=tenacity.stop_after_attempt(4),
+    reraise=True,
+)
+
+class _CircuitBreaker:
+    """
+    Fails calls fast with a 503 once a provider has failed `fail_max` times in a row
+    (after retries), then lets a single trial call through every `reset_timeout` seconds.
+    Only transient errors count; a bad request says nothing about the provider's health.
+    """
+    def __init__(self, provider_name: str, fail_max: int = 5, reset_timeout: float = 30.0):
+        self.provider_name = provider_name
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+
+    async def __aenter__(self):
+        if self._opened_at is None:
+            return
+        now = time.monotonic()
+        if now - self._opened_at < self.reset_timeout:
+            raise HTTPException(status_code=503, detail=f"The {self.provider_name} API is temporarily unavailable after repeated failures. Please try again shortly.")
+        # Half-open: this call is the trial. Re-stamping keeps every concurrent call
+        # failing fast until it succeeds or the next window opens.
+        self._opened_at = now
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._failures, self._opened_at = 0, None
+        # Cancellations (e.g. a client disconnecting mid-stream) and non-transient
+        # errors leave the state as it was.
+        elif issubclass(exc_type, Exception) and _is_transient_error(exc):
+            self._failures += 1
+            if self._failures >= self.fail_max: # Also re-opens straight away after a failed trial
+                self._opened_at = time.monotonic()
+        return False
+
+_gemini_breaker = _CircuitBreaker("Gemini")
+_openrouter_breaker = _CircuitBreaker("OpenRouter")
+
+async def warm_up_http_clients():
+    """Opens the OpenRouter connection ahead of the first request so it skips the TLS handshake."""
+    if not _openrouter_client():
+        return
+    try:
+        await _openrouter_client().models.list()
+    except Exception as e:
+        print(f"OpenRouter warm-up failed: {e}")
+
+class _KeyPool:
+    """Round-robins API keys, skipping any that are parked after hitting a rate limit."""
+    def __init__(self, keys: List[str]):
+        self._keys = keys
+        self._next = 0
+        self._parked_until: Dict[str, float] = {}
+
+    def acquire(self) -> str:
+        now = time.monotonic()
+        for _ in range(len(self._keys)):
+            key = self._keys[self._next]
+            self._next = (self._next + 1) % len(self._keys)
+            if self._parked_until.get(key, 0.0) <= now:
+                return key
+        # Every key is parked; use the one that frees up first.
+        return min(self._keys, key=lambda k: self._parked_until[k])
+
+    def park(self, key: str, seconds: float):
+        self._parked_until[key] = time.monotonic() + seconds
+
+_gemini_keys = _KeyPool(GEMINI_API_KEYS)
+_openrouter_keys = _KeyPool(OPEN_ROUTER_KEYS)
+
+def _parse_retry_delay(value: Any) -> Optional[float]:
+    """Seconds from a Retry-After header, a protobuf Duration or a JSON duration such as "37s"."""
+    if hasattr(value, "ToTimedelta"):
+        return value.ToTimedelta().total_seconds()
+    try:
+        return float(str(value).rstrip("s"))
+    except ValueError: # e.g. an HTTP-date Retry-After
+        return None
+
+def _rate_limit_cooldown(e: BaseException) -> float:
+    """How long to park a key after a 429: the provider's retry delay when it sends one."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None and headers.get("retry-after"):
+        delay = _parse_retry_delay(headers["retry-after"])
+        if delay is not None:
+            return delay
+    # Gemini returns a google.rpc.RetryInfo among the error details.
+    for detail in getattr(e, "details", None) or ():
+        retry_delay = detail.get("retryDelay") if isinstance(detail, dict) else getattr(detail, "retry_delay", None)
+        delay = _parse_retry_delay(retry_delay) if retry_delay is not None else None
+        if delay is not None:
+            return delay
+    return KEY_COOLDOWN_SECONDS
+
+async def close_http_clients():
+    """Releases pooled connections; called from the app shutdown hook."""
+    for client in _openrouter_clients.values():
+        await client.close()
 
 # --- API Call Functions ---
 
-def call_gemini_api(prompt: str, is_json_output: bool = False) -> str:
-    """Calls the Google Gemini API."""
-    if not GEMINI_API_KEY:
+@_retry_on_transient_error
+async def _openrouter_create(**kwargs):
+    """Sends one request on the next available key; each retry may land on a different key."""
+    api_key = _openrouter_keys.acquire()
+    try:
+        async with _attempt_slot("openrouter", kwargs.get("stream", False)), _rate_limited("openrouter", OPENROUTER_RPM):
+            return await _openrouter_client(api_key).chat.completions.create(**kwargs)
+    except Exception as e:
+        import openai
+        if isinstance(e, openai.RateLimitError):
+            _openrouter_keys.park(api_key, _rate_limit_cooldown(e))
+        raise
+
+GEMINI_MODEL = 'gemini-2.5-pro'
+# Cheaper, faster tier for the light sub-prompts (summary line, skills reordering).
+GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash")
+OPENROUTER_MODEL = "openai/gpt-3.5-turbo" # You can change this to other models supported by OpenRouter
+
+# Given by name so the SDK's enum types don't have to be imported up front.
+_SAFETY_SETTINGS = {
+    "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+    "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+}
+DEFAULT_MAX_OUTPUT_TOKENS = 8192
+_GEN_CFG_TEXT = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 64,
+    "max_output_tokens": DEFAULT_MAX_OUTPUT_TOKENS,
+}
+_GEN_CFG_JSON = {**_GEN_CFG_TEXT, "response_mime_type": "application/json"}
+# Gemini 2.5 counts its thinking tokens against max_output_tokens, so tighter
+# per-call caps get this much extra room to avoid truncating to an empty answer.
+GEMINI_THINKING_HEADROOM = 3072
+
+@functools.lru_cache(maxsize=None)
+def _gemini_async_client(api_key: str):
+    """
+    One SDK transport per API key; genai.configure only holds a single global key.
+    The SDK has no public per-key client, so this relies on its private _ClientManager
+    and GenerativeModel._async_client; requirements.txt pins the version they match.
+    """
+    from google.generativeai.client import _ClientManager
+    manager = _ClientManager()
+    manager.configure(api_key=api_key)
+    return manager.get_default_client("generative_async")
+
+@functools.lru_cache(maxsize=64)
+def _get_model(model_name: str, json_output: bool, system_instruction: Optional[str] = None, api_key: Optional[str] = None) -> "genai.GenerativeModel":
+    """Builds the Gemini model with the app's generation and safety settings, once per config."""
+    model = _genai().GenerativeModel(
+        model_name,
+        generation_config=_GEN_CFG_JSON if json_output else _GEN_CFG_TEXT,
+        safety_settings=_SAFETY_SETTINGS,
+        system_instruction=system_instruction
+    )
+    if api_key:
+        model._async_client = _gemini_async_client(api_key)
+    return model
+
+@_retry_on_transient_error
+async def _gemini_generate(prompt: str, json_output: bool, system_instruction: Optional[str], model_name: str = GEMINI_MODEL, **kwargs):
+    """Sends one request on the next available key; each retry may land on a different key."""
+    api_key = _gemini_keys.acquire()
+    model = _get_model(model_name, json_output, system_instruction, api_key)
+    try:
+        async with _attempt_slot("gemini", kwargs.get("stream", False)), _rate_limited(f"gemini:{api_key}", GEMINI_RPM_PER_KEY):
+            return await model.generate_content_async(prompt, **kwargs)
+    except Exception as e:
+        from google.api_core import exceptions as google_exceptions
+        if isinstance(e, google_exceptions.ResourceExhausted):
+            _gemini_keys.park(api_key, _rate_limit_cooldown(e))
+        raise
+
+def _gemini_call_config(max_output_tokens: int, temperature: Optional[float], response_schema: Optional[Dict] = None) -> Dict:
+    """Per-call overrides layered on top of the cached model's generation config."""
+    if max_output_tokens >= DEFAULT_MAX_OUTPUT_TOKENS: # Large budgets (e.g. batches) already include thinking room
+        overrides = {"max_output_tokens": max_output_tokens}
+    else:
+        overrides = {"max_output_tokens": min(max_output_tokens + GEMINI_THINKING_HEADROOM, DEFAULT_MAX_OUTPUT_TOKENS)}
+    if temperature is not None:
+        overrides["temperature"] = temperature
+    if response_schema is not None:
+        overrides["response_schema"] = response_schema
+    return overrides
+
+async def call_gemini_api(prompt: str, is_json_output: bool = False, max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS, temperature: Optional[float] = None, system_instruction: Optional[str] = None, model_name: str = GEMINI_MODEL, response_schema: Optional[Dict] = None) -> str:
+    """Calls the Google Gemini API without blocking the event loop."""
+    if not GEMINI_API_KEYS:
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY environment variable not set.")
     
     try:
-        generation_config = {
-            "temperature": 0.7, 
-            "top_p": 0.95, 
-            "top_k": 64, 
-            "max_output_tokens": 8192,
-        }
-        if is_json_output:
-            generation_config["response_mime_type"] = "application/json"
-
-        safety_settings = {
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-        }
-
-        model = genai.GenerativeModel(
-            'gemini-2.5-pro',
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
-        
-        response = model.generate_content(prompt)
+        async with _gemini_breaker:
+            response = await _gemini_generate(
+                prompt, is_json_output, system_instruction, model_name,
+                generation_config=_gemini_call_config(max_output_tokens, temperature, response_schema)
+            )
         
         if not response.candidates or not response.candidates[0].content or not response.candidates[0].content.parts:
             finish_reason_name = "UNKNOWN"
@@ -61,26 +361,30 @@ def call_gemini_api(prompt: str, is_json_output: bool = False) -> str:
             raise e
         raise HTTPException(status_code=503, detail=f"An error occurred with the Gemini API: {e}")
 
-def call_openrouter_api(prompt: str, is_json_output: bool = False) -> str:
-    """Calls the OpenRouter API using the OpenAI SDK."""
-    if not OPEN_ROUTER_KEY:
+def _openrouter_messages(prompt: str, system_instruction: Optional[str]) -> List[Dict[str, str]]:
+    messages = [{"role": "user", "content": prompt}]
+    if system_instruction:
+        messages.insert(0, {"role": "system", "content": system_instruction})
+    return messages
+
+async def call_openrouter_api(prompt: str, is_json_output: bool = False, max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS, temperature: Optional[float] = None, system_instruction: Optional[str] = None) -> str:
+    """Calls the OpenRouter API using the async OpenAI SDK."""
+    if not _openrouter_client():
         raise HTTPException(status_code=500, detail="OPEN_ROUTER_KEY environment variable not set.")
 
-    client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=OPEN_ROUTER_KEY,
-    )
-    
     try:
-        messages = [{"role": "user", "content": prompt}]
+        messages = _openrouter_messages(prompt, system_instruction)
         
         response_format = {"type": "json_object"} if is_json_output else {"type": "text"}
 
-        response = client.chat.completions.create(
-            model="openai/gpt-3.5-turbo", # You can change this to other models supported by OpenRouter
-            messages=messages,
-            response_format=response_format
-        )
+        async with _openrouter_breaker:
+            response = await _openrouter_create(
+                model=OPENROUTER_MODEL,
+                messages=messages,
+                response_format=response_format,
+                max_tokens=max_output_tokens,
+                **({"temperature": temperature} if temperature is not None else {})
+            )
         
         content = response.choices[0].message.content
         if not content:
@@ -94,128 +398,275 @@ def call_openrouter_api(prompt: str, is_json_output: bool = False) -> str:
             raise e
         raise HTTPException(status_code=503, detail=f"An error occurred with the OpenRouter API: {e}")
 
+# --- Streaming Call Functions ---
 
-# --- Agent Definitions ---
+@contextlib.asynccontextmanager
+async def _aclosing(agen):
+    """contextlib.aclosing for Python 3.9: closes the generator (and the provider stream under it) on early exit."""
+    try:
+        yield agen
+    finally:
+        await agen.aclose()
 
-def agent_resume_tailor(jd_text: str, fixed_resume_yaml: str, model_provider: str = "gemini") -> str:
+async def _batch_chunks(chunks: AsyncIterator[str], batch_size: int, flush_interval: float) -> AsyncIterator[str]:
     """
-    The Resume Tailoring Agent. It receives fixed resume data (with context) and a job description,
-    and returns only the AI-generated content in a structured format.
+    Groups streamed text so the client gets a write every ~batch_size characters
+    or flush_interval seconds instead of one tiny HTTP write per token.
     """
-    prompt = f"""
-You are an expert ATS resume architect and career strategist. Your sole function is to deconstruct a target job description and completely re-engineer a candidate's information into a high-impact ATS optimized resume. Your primary directive is to make the candidate appear as the perfect-fit applicant by strategically inventing and aligning their experience with the role's requirements. You must output a valid JSON string.
+    buffer = []
+    buffered_chars = 0
+    last_flush = time.monotonic()
+    async with _aclosing(chunks):
+        async for text in chunks:
+            buffer.append(text)
+            buffered_chars += len(text)
+            if buffered_chars >= batch_size or time.monotonic() - last_flush >= flush_interval:
+                yield "".join(buffer)
+                buffer, buffered_chars, last_flush = [], 0, time.monotonic()
+    if buffer:
+        yield "".join(buffer)
 
-**Target Job Description:**
----
-{jd_text}
----
+async def stream_gemini_api(prompt: str, is_json_output: bool = False, batch_size: int = STREAM_BATCH_CHARS, system_instruction: Optional[str] = None, max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS, response_schema: Optional[Dict] = None) -> AsyncIterator[str]:
+    """Streams a Gemini response as batched text chunks."""
+    if not GEMINI_API_KEYS:
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY environment variable not set.")
+
+    async def chunk_texts():
+        # The slot is held for the whole stream since the connection stays open until the last chunk.
+        async with _gemini_breaker, _provider_semaphore("gemini"):
+            response = await _gemini_generate(
+                prompt, is_json_output, system_instruction,
+                generation_config=_gemini_call_config(max_output_tokens, None, response_schema), stream=True
+            )
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError: # Chunks without parts (e.g. the final finish-reason chunk)
+                    continue
+                if text:
+                    yield text
+
+    try:
+        async with _aclosing(_batch_chunks(chunk_texts(), batch_size, STREAM_FLUSH_SECONDS)) as batches:
+            async for batch in batches:
+                yield batch
+    except Exception as e:
+        print(f"An error occurred with the Gemini API: {e}")
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=503, detail=f"An error occurred with the Gemini API: {e}")
+
+async def stream_openrouter_api(prompt: str, is_json_output: bool = False, batch_size: int = STREAM_BATCH_CHARS, system_instruction: Optional[str] = None, max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS) -> AsyncIterator[str]:
+    """Streams an OpenRouter response as batched text chunks."""
+    if not _openrouter_client():
+        raise HTTPException(status_code=500, detail="OPEN_ROUTER_KEY environment variable not set.")
 
+    async def chunk_texts():
+        response_format = {"type": "json_object"} if is_json_output else {"type": "text"}
+        async with _openrouter_breaker, _provider_semaphore("openrouter"):
+            stream = await _openrouter_create(
+                model=OPENROUTER_MODEL,
+                messages=_openrouter_messages(prompt, system_instruction),
+                response_format=response_format,
+                max_tokens=max_output_tokens,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    try:
+        async with _aclosing(_batch_chunks(chunk_texts(), batch_size, STREAM_FLUSH_SECONDS)) as batches:
+            async for batch in batches:
+                yield batch
+    except Exception as e:
+        print(f"An error occurred with the OpenRouter API: {e}")
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=503, detail=f"An error occurred with the OpenRouter API: {e}")
+
+
+# --- Resume Tailoring Prompts ---
+# The tailoring task is split into four independent sub-prompts so they can run
+# concurrently; each one only receives the slice of the base resume it needs.
+# The static instructions go in the system prompt, and the user message puts the
+# resume ahead of the job description, so everything up to the job description
+# is a stable prefix the provider can serve from its prompt cache.
+
+_TAILOR_ROLE = """
+You are an expert ATS resume architect and career strategist. Your sole function is to deconstruct a target job description and completely re-engineer a candidate's information into a high-impact ATS optimized resume. Your primary directive is to make the candidate appear as the perfect-fit applicant by strategically inventing and aligning their experience with the role's requirements. You must output a valid JSON string.
+"""
+
+_TAILOR_INPUTS = """
 **Candidate's Base Information & Context (Use as a creative seed):**
 ```yaml
-{fixed_resume_yaml}
+{context_yaml}
 ```
 ---
 
-**Your Task & Strict Instructions:**
-Generate a JSON structure containing ONLY the following keys: `summary`, `skills_reordered`, `experience_bullets`, and `projects_reordered`.
-
-1.  **`summary`**:
-    - Write a powerful, 1-line professional summary (max 20 words, entire line must be under 140 characters) that perfectly mirrors the top requirements of the job description. State the candidate has 3 years of experience.
-
-2.  **`skills_reordered`**:
-    - **Reorder the skill category blocks** from the fixed information based on their relevance to the job description. Retain all categories.
-    - **Reorder the individual skills within each category** to prioritize those most relevant to the job description first.
-    - **Identify skills mentioned in the job description that are missing** from the candidate's list but are relevant to their profile. Make sure you are not repeating skills across the categories as well.
-    - **Insert these new, relevant skills into the most appropriate existing categories**, maintaining the relevance-based order. Do NOT create new categories.
+**Target Job Description:**
+---
+{jd_text}
+---
+"""
 
-3.  **`experience_bullets`**:
+_BULLET_RULES = """
     - **Re-engineer from scratch:** Do NOT just rephrase the context from the YAML. Your task is to **invent new, highly relevant bullet points** that directly address the challenges and requirements of the job description.
     - **Inject industry context:** If the job description mentions a specific industry (e.g., finance, healthcare), you MUST invent details reflecting that context (e.g., "analyzed financial reports," "processed patient data") only if it aligns with the context. For example: there can be financial reports in beverages company, but it wont have access to healthcare records right.
     - For majority bullets, you must first articulate the business **problem** or **challenge**, then the **action** taken, and finally the **quantifiable result**.
     - **INVENT QUANTIFIABLE METRICS.** For majority bullets **MUST** include a plausible, impactful metric. Invent realistic ones if not provided. Examples: "reduced latency by 30%", "processed 500GB of data", "increased user engagement by 15%", "saved $50,000 in operational costs".
-    - Word Count: make the entire line is 140 characters. strict.
     - **Strategic Bolding**: Identify the most critical parts of each bullet points based on the bullet itself and the job description. Wrap these keywords in `<b>...</b>` tags. Use this sparingly—aim for 1-3 bolded phrases per bullet to maximize impact without cluttering the text. Dont focus on the reseults always. Highlighting actions are also important.
+    - Example: if JD require experience with Databricks, etc. then make sure you include that in the bullet points.
+"""
+
+_SUMMARY_TASK = """
+**Your Task & Strict Instructions:**
+Generate a JSON structure containing ONLY the key `summary`.
+
+- Write a powerful, 1-line professional summary (max 20 words, entire line must be under 140 characters) that perfectly mirrors the top requirements of the job description. State the candidate has 3 years of experience.
+
+**Output Format & Example:**
+Your entire output MUST be a single, valid JSON string without any other text, explanations, or markdown. It must follow this exact structure:
+
+```json
+{
+  "summary": "A powerful, 1-line professional summary..."
+}
+```
+"""
+
+_SKILLS_TASK = """
+**Your Task & Strict Instructions:**
+Generate a JSON structure containing ONLY the key `skills_reordered`.
+
+- **Reorder the skill category blocks** from the fixed information based on their relevance to the job description. Retain all categories.
+- **Reorder the individual skills within each category** to prioritize those most relevant to the job description first.
+- **Identify skills mentioned in the job description that are missing** from the candidate's list but are relevant to their profile. Make sure you are not repeating skills across the categories as well.
+- **Insert these new, relevant skills into the most appropriate existing categories**, maintaining the relevance-based order. Do NOT create new categories.
+
+**Output Format & Example:**
+Your entire output MUST be a single, valid JSON string without any other text, explanations, or markdown. It must follow this exact structure:
+
+```json
+{
+  "skills_reordered": [
+    { "ML_Techniques": ["Regression", "Classification", "..."] },
+    { "Cloud": ["AWS (Lambda, S3, Bedrock)", "..."] }
+  ]
+}
+```
+"""
+
+_EXPERIENCE_TASK = """
+**Your Task & Strict Instructions:**
+Generate a JSON structure containing ONLY the key `experience_bullets`, with one entry per job in the same order as the candidate's experience.
+""" + _BULLET_RULES + """    - Word Count: make the entire line is 140 characters. strict.
     - Number of Bullets:
         - DRINKS: 4 points
         - AB INBEV: 8 points
         - Janta Ka Mood: 2 points
-    - Example: if JD require experience with Databricks, etc. then make sure you include that in the bullet points.
-
-4.  **`projects_reordered`**:
-    - **Follow all rules from the `experience_bullets` section:** Re-engineer the content to be heavily job-description-focused, inject industry context, use the PAR framework, and invent compelling, quantifiable metrics for each bullet.
-    - Keep the original `title` and `dates` for each project.
-    - Each bullet must be under 150 characters.
-    - Use strategic `<b>...</b>` bolding.
-    - Only 2 bullets per project.
-    - **You MUST process and return ALL projects** provided in the candidate's base information.
-    - Reorder the projects based on the relevance of generated bullets to the job description.
 
 **Output Format & Example:**
 Your entire output MUST be a single, valid JSON string without any other text, explanations, or markdown. It must follow this exact structure:
 
 ```json
-{{
-  "summary": "A powerful, 1-line professional summary...",
-  "skills_reordered": [
-    {{ "ML_Techniques": ["Regression", "Classification", "..."] }},
-    {{ "Cloud": ["AWS (Lambda, S3, Bedrock)", "..."] }}
-  ],
+{
   "experience_bullets": [
-    {{
+    {
       "bullets": [
         "Addressed X challenge by implementing Y solution, achieving a 20% improvement in Z.",
         "Solved the problem of A by developing B, which processed 500GB of data daily.",
         "..."
       ]
-    }}
-  ],
+    }
+  ]
+}
+```
+"""
+
+_PROJECTS_TASK = """
+**Your Task & Strict Instructions:**
+Generate a JSON structure containing ONLY the key `projects_reordered`.
+""" + _BULLET_RULES + """    - Keep the original `title` and `dates` for each project.
+    - Each bullet must be under 150 characters.
+    - Only 2 bullets per project.
+    - **You MUST process and return ALL projects** provided in the candidate's base information.
+    - Reorder the projects based on the relevance of generated bullets to the job description.
+
+**Output Format & Example:**
+Your entire output MUST be a single, valid JSON string without any other text, explanations, or markdown. It must follow this exact structure:
+
+```json
+{
   "projects_reordered": [
-    {{
+    {
       "title": "AI Fantasy Team Predictor",
       "dates": "Mar 2025 - May 2025",
       "bullets": [
         "To provide cricket fans with a data-driven tool to create optimal fantasy teams and enhance engagement.",
         "Developed a GradientBoosting model and deployed it on GCP, improving prediction accuracy by over 95%."
       ]
-    }}
+    }
   ]
-}}
+}
 ```
 """
-    if model_provider == "chatgpt":
-        generated_content_str = call_openrouter_api(prompt, is_json_output=True)
-    else: # Default to gemini
-        generated_content_str = call_gemini_api(prompt, is_json_output=True)
-    
-    cleaned_str = generated_content_str.replace("```json", "").replace("```", "").strip()
-    return cleaned_str
 
-def agent_cold_email_generator(company_name: str, role_title: str, recruiter_name: str, recipient_linkedin_url: str, resume_yaml: str, jd_text: str, additional_details: str, model_provider: str = "gemini") -> str:
-    """
-    The Cold Email Agent. It receives contact/job info and a finalized resume,
-    researches online, and generates a personalized cold email.
-    """
-    prompt = f"""
+PROMPT_SUMMARY = _TAILOR_ROLE + _SUMMARY_TASK
+PROMPT_SKILLS = _TAILOR_ROLE + _SKILLS_TASK
+PROMPT_EXPERIENCE = _TAILOR_ROLE + _EXPERIENCE_TASK
+PROMPT_PROJECTS = _TAILOR_ROLE + _PROJECTS_TASK
+
+# --- Batch Resume Tailoring Prompt ---
+# Several applications packed into one call; the section tasks above are reused
+# verbatim and the model returns one merged object per job.
+
+_BATCH_TAILOR_HEADER = _TAILOR_ROLE + """
+You will tailor the candidate's resume for each of the following {job_count} jobs independently.
+Return a JSON array with exactly {job_count} objects, in the same order as the jobs. Each object must contain the keys `summary`, `skills_reordered`, `experience_bullets` and `projects_reordered`, produced by following the four sets of instructions after the jobs. Where an instruction says to generate ONLY one key, that key goes into the job's object alongside the other three.
+"""
+
+_BATCH_JOB_BLOCK = """
+**Job {index} - Candidate's Base Information & Context (Use as a creative seed):**
+```yaml
+{context_yaml}
+```
+---
+
+**Job {index} - Target Job Description:**
+---
+{jd_text}
+---
+"""
+
+# --- Shared Application Context ---
+# The finalized resume and job description block used by both the cold email and
+# cover letter prompts; rendered once per (jd, resume) pair via _render_context.
+
+_APPLICATION_CONTEXT = """
+**Candidate's Finalized Resume (YAML format):**
+```yaml
+{resume_yaml}
+```
+
+**Target Job Description:**
+---
+{jd_text}
+---
+"""
+
+# --- Cold Email Prompt ---
+
+# A cold email is ~300 words and a cover letter body ~400, plus JSON overhead.
+COLD_EMAIL_MAX_TOKENS = 800
+COVER_LETTER_MAX_TOKENS = 1000
+
+_COLD_EMAIL_SYSTEM = """
 You are an expert career coach and copywriter specializing in crafting compelling cold emails for job applications. Your task is to generate a personalized email to a contact person at a company. You MUST use the internet to perform research to make the email as impactful as possible.
 
 **Your Goal:**
 Write an email that is professional, concise, highly personalized, and grabs the contact's attention, making them want to learn more about the candidate. The email should tell a compelling story, not just list facts.
 
-**Input Information:**
-1.  **Company Name:** {company_name}
-2.  **Role Title:** {role_title}
-3.  **Contact Name:** {recruiter_name if recruiter_name else "Not Provided"}
-4.  **Contact's LinkedIn Profile:** {recipient_linkedin_url if recipient_linkedin_url else "Not Provided"}
-5.  **Candidate's Finalized Resume (YAML format):**
-    ```yaml
-    {resume_yaml}
-    ```
-6.  **Target Job Description:**
-    ---
-    {jd_text}
-    ---
-7.  **Additional Details from User:** {additional_details if additional_details else "None"}
-
 **Your Multi-Step Task & Strict Instructions:**
 
 **Step 1: Research Contact Person (LinkedIn Analysis)**
@@ -229,13 +680,13 @@ Write an email that is professional, concise, highly personalized, and grabs the
 
 **Step 2: Synthesize and Write a Compelling Narrative**
 - Based on all the information gathered, write the email.
-- **Subject Line:** You MUST use one of these two formats: "Inquiry regarding {role_title} at {company_name}" or "Interested in the {role_title} role at {company_name}". Choose one.
+- **Subject Line:** You MUST use one of these two formats: "Inquiry regarding [Role Title] at [Company Name]" or "Interested in the [Role Title] role at [Company Name]", filled in from the input information. Choose one.
 - **Tone:** Confident, respectful, and enthusiastic. No em dashes or no hyphenated words.
 - **Structure:**
     - **Opener:** Start with a highly personalized hook based on your deep LinkedIn research (e.g., "I was impressed by your recent article on the future of AI in finance..." or "I noticed we both share an interest in scalable cloud architectures..."). If no LinkedIn is provided, use a polite, direct opening.
-    - **Introduction:** Briefly introduce the candidate and clearly state the purpose of the email – expressing interest in the **{role_title}** position at **{company_name}**.
+    - **Introduction:** Briefly introduce the candidate and clearly state the purpose of the email – expressing interest in the role at the company named in the input information.
     - **The "Why" - Create a Narrative:** This is the most important part. Do not just list skills. Weave a compelling 1-2 paragraph story. Connect the candidate's key experiences from their resume to the most critical requirements in the job description. For example, instead of saying "Reduced latency by 30%", say "At my previous role, I tackled the challenge of slow data processing by architecting a new ETL pipeline, which ultimately reduced latency by 30% and unlocked new analytics capabilities." Frame their skills as solutions to the problems mentioned in the JD.
-    - **Call to Action:** Propose a brief chat to discuss the role further. Make it easy for them by suggesting a specific action (e.g., "Are you available for a brief chat to discuss how my background in [mention 1-2 key skills] could support the team at {company_name}?").
+    - **Call to Action:** Propose a brief chat to discuss the role further. Make it easy for them by suggesting a specific action (e.g., "Are you available for a brief chat to discuss how my background in [mention 1-2 key skills] could support the team at [Company Name]?").
     - **Closing:** A professional closing (e.g., "Best regards,").
 
 **Step 3: Generate Output**
@@ -245,52 +696,32 @@ Write an email that is professional, concise, highly personalized, and grabs the
 
 **Output Format & Example:**
 ```json
-{{
+{
   "subject": "Inquiry regarding Data Scientist role at TechCorp",
   "body": "Hi [Contact Name],\\n\\nI recently read your insightful post on LinkedIn about the challenges of deploying LLMs at scale, and it perfectly captured the complexities I've been passionate about solving. I'm writing today to express my enthusiastic interest in the Data Scientist position at TechCorp.\\n\\nIn my recent project, I led the development of an AI-powered recommendation engine, where I engineered a RAG architecture that improved retrieval precision by 40%. This experience, combined with my background in building and deploying scalable systems on GCP, seems to align directly with the needs you've outlined for this role, particularly around MLOps and model optimization.\\n\\nI am confident that my problem-solving approach and technical skills would allow me to contribute significantly to your team. Would you be open to a brief 15-minute chat next week to discuss this further?\\n\\nBest regards,\\n[Candidate Name]"
-}}
+}
 ```
 """
-    if model_provider == "chatgpt":
-        generated_content_str = call_openrouter_api(prompt, is_json_output=True)
-    else: # Default to gemini
-        generated_content_str = call_gemini_api(prompt, is_json_output=True)
-    
-    cleaned_str = generated_content_str.replace("```json", "").replace("```", "").strip()
-    
-    try:
-        json.loads(cleaned_str)
-        return cleaned_str
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON from LLM response: {e}")
-        print(f"LLM Response was:\n{cleaned_str}")
-        raise HTTPException(status_code=500, detail="Failed to get valid JSON from the email generation agent.")
 
-def agent_cover_letter_generator(resume_yaml: str, jd_text: str, additional_details: str, model_provider: str = "gemini") -> str:
-    """
-    The Cover Letter Agent. It receives a finalized resume, job description, and user notes
-    to generate a tailored cover letter.
-    """
-    prompt = f"""
+_COLD_EMAIL_INPUTS = """{application_context}
+**Input Information:**
+1.  **Company Name:** {company_name}
+2.  **Role Title:** {role_title}
+3.  **Contact Name:** {recruiter_name}
+4.  **Contact's LinkedIn Profile:** {recipient_linkedin_url}
+5.  **Additional Details from User:** {additional_details}
+"""
+
+# --- Cover Letter Prompt ---
+# Split like the cold email prompt: fixed instructions in the system prompt, and
+# the resume, job description and user notes (most variable last) in the user message.
+
+_COVER_LETTER_SYSTEM = """
 You are an expert career coach and professional writer, specializing in creating impactful cover letters that get noticed. Your task is to write a compelling, tailored cover letter based on the provided information.
 
 **Your Goal:**
 Draft a cover letter that tells a persuasive story, connecting the candidate's achievements directly to the needs outlined in the job description. The tone should be professional, confident, and genuinely enthusiastic.
 
-**Input Information:**
-1.  **Candidate's Finalized Resume (YAML format):**
-    ```yaml
-    {resume_yaml}
-    ```
-2.  **Target Job Description:**
-    ---
-    {jd_text}
-    ---
-3.  **Additional Details & Instructions from User:**
-    ---
-    {additional_details if additional_details else "None"}
-    ---
-
 **Your Task & Strict Instructions:**
 
 1.  **Analyze and Synthesize:**
@@ -316,22 +747,468 @@ Draft a cover letter that tells a persuasive story, connecting the candidate's a
 
 **Example Output:**
 ```json
-{{
+{
   "cover_letter_body": "Dear Hiring Committee,\\n\\nI am writing to express my enthusiastic interest in the Data Scientist position at TechCorp, as advertised on LinkedIn. Having followed TechCorp's innovations in machine learning, I am particularly impressed by your commitment to developing scalable AI solutions, and I am confident that my skills and experience align perfectly with the requirements of this role.\\n\\nIn my previous role at AB InBev, I led a project to automate financial reporting workflows, which involved designing and deploying robust ETL pipelines that ultimately saved the company $500,000 annually. This experience directly relates to your need for a candidate who can handle large-scale data systems and deliver measurable business impact. Furthermore, my work on the AI Fantasy Team Predictor project honed my skills in model tuning and MLOps, where I improved prediction accuracy by over 95% and deployed the system on a scalable GCP architecture—capabilities that I am excited to bring to your team.\\n\\nMy background has equipped me with a strong foundation in both the theoretical and practical aspects of data science. I am eager to discuss how my problem-solving abilities and technical expertise can help TechCorp continue to innovate. Thank you for your time and consideration.\\n\\nI look forward to hearing from you soon."
-}}
+}
 ```
 """
-    if model_provider == "chatgpt":
-        generated_content_str = call_openrouter_api(prompt, is_json_output=True)
-    else: # Default to gemini
-        generated_content_str = call_gemini_api(prompt, is_json_output=True)
-    
-    cleaned_str = generated_content_str.replace("```json", "").replace("```", "").strip()
-    
+
+_COVER_LETTER_INPUTS = """
+**Input Information:**
+{application_context}
+**Additional Details & Instructions from User:**
+---
+{additional_details}
+---
+"""
+
+# --- Response Schemas ---
+# Gemini constrains its output to these shapes, so a reply always parses with the
+# expected keys. The skills section is keyed by the resume's own category names and
+# batched replies repeat it, so neither has a fixed schema and they rely on JSON mode alone.
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+def _object_schema(**properties: Dict) -> Dict:
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+_SUMMARY_SCHEMA = _object_schema(summary={"type": "string"})
+_EXPERIENCE_SCHEMA = _object_schema(experience_bullets={"type": "array", "items": _object_schema(bullets=_STRING_LIST)})
+_PROJECTS_SCHEMA = _object_schema(projects_reordered={
+    "type": "array",
+    "items": _object_schema(title={"type": "string"}, dates={"type": "string"}, bullets=_STRING_LIST),
+})
+_COLD_EMAIL_SCHEMA = _object_schema(subject={"type": "string"}, body={"type": "string"})
+_COVER_LETTER_SCHEMA = _object_schema(cover_letter_body={"type": "string"})
+
+# --- Agent Definitions ---
+
+# Cache entries are keyed on the model, generation settings and prompt templates as
+# well as the inputs, so editing a prompt or switching models never serves stale output.
+_MODEL_FINGERPRINTS = {
+    "gemini": make_cache_key(GEMINI_MODEL, GEMINI_FAST_MODEL, orjson.dumps(_GEN_CFG_JSON).decode(), str(GEMINI_THINKING_HEADROOM)),
+    "chatgpt": make_cache_key(OPENROUTER_MODEL),
+}
+_PROMPT_FINGERPRINTS = {
+    "resume_tailor": make_cache_key(PROMPT_SUMMARY, PROMPT_SKILLS, PROMPT_EXPERIENCE, PROMPT_PROJECTS, _TAILOR_INPUTS, orjson.dumps([_SUMMARY_SCHEMA, _EXPERIENCE_SCHEMA, _PROJECTS_SCHEMA]).decode()),
+    "cold_email": make_cache_key(_COLD_EMAIL_SYSTEM, _COLD_EMAIL_INPUTS, _APPLICATION_CONTEXT, orjson.dumps(_COLD_EMAIL_SCHEMA).decode()),
+    "cover_letter": make_cache_key(_COVER_LETTER_SYSTEM, _COVER_LETTER_INPUTS, _APPLICATION_CONTEXT, orjson.dumps(_COVER_LETTER_SCHEMA).decode()),
+}
+
+def _agent_cache_key(agent: str, model_provider: str, jd_text: str, *inputs: str) -> CacheKey:
+    model = _MODEL_FINGERPRINTS.get(model_provider, _MODEL_FINGERPRINTS["gemini"]) # Unknown providers fall back to Gemini
+    return make_agent_cache_key(agent, model_provider, jd_text, model, _PROMPT_FINGERPRINTS[agent], *inputs)
+
+_FENCE_RE = re.compile(r"^\s*```(?:json|yaml)?\s*|\s*```\s*$")
+
+def _strip_fences(text: str) -> str:
+    """Removes markdown code fences; JSON mode normally omits them, so this is usually a no-op."""
+    return _FENCE_RE.sub("", text) if text.lstrip().startswith("```") else text
+
+def _parse_json_output(generated_content_str: str, agent_name: str) -> Dict:
+    """Parses a JSON-mode model response, raising a 500 if it is not valid JSON."""
+    try:
+        return orjson.loads(generated_content_str)
+    except orjson.JSONDecodeError:
+        pass # JSON mode normally returns bare JSON; only a fenced reply needs cleaning up
+    cleaned_str = _strip_fences(generated_content_str)
     try:
-        json.loads(cleaned_str)
-        return cleaned_str
-    except json.JSONDecodeError as e:
+        return orjson.loads(cleaned_str)
+    except orjson.JSONDecodeError as e:
         print(f"Error decoding JSON from LLM response: {e}")
         print(f"LLM Response was:\n{cleaned_str}")
-        raise HTTPException(status_code=500, detail="Failed to get valid JSON from the cover letter generation agent.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to get valid JSON from the {agent_name} agent.")
+
+class _JsonObjectExtractor:
+    """
+    Tracks brace depth across streamed chunks, ignoring braces inside strings, so the
+    first top-level JSON object can be parsed the moment its closing brace arrives.
+    """
+    def __init__(self):
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> Optional[str]:
+        """Consumes a chunk; returns the complete object text once it is balanced, else None."""
+        start = 0 if self._depth else None
+        for i, ch in enumerate(text):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"' and self._depth:
+                self._in_string = True
+            elif ch == "{":
+                if not self._depth:
+                    start = i
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if not self._depth:
+                    return "".join(self._parts) + text[start:i + 1]
+        if start is not None:
+            self._parts.append(text[start:])
+        return None
+
+async def _stream_json(prompt: str, model_provider: str, agent_name: str, system_instruction: Optional[str] = None, max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS, response_schema: Optional[Dict] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streams a JSON-mode response as ("chunk", text) pairs and finishes with ("done", parsed_object)
+    as soon as the top-level object closes, without waiting for any trailing fence or whitespace.
+    """
+    if model_provider == "chatgpt":
+        stream = stream_openrouter_api(prompt, is_json_output=True, system_instruction=system_instruction, max_output_tokens=max_output_tokens)
+    else: # Default to gemini
+        stream = stream_gemini_api(prompt, is_json_output=True, system_instruction=system_instruction, max_output_tokens=max_output_tokens, response_schema=response_schema)
+
+    extractor = _JsonObjectExtractor()
+    parts = []
+    async with _aclosing(stream):
+        async for text in stream:
+            parts.append(text)
+            yield "chunk", text
+            complete = extractor.feed(text)
+            if complete is not None:
+                yield "done", _parse_json_output(complete, agent_name)
+                return
+
+    # The stream ended without a balanced object; this raises with the usual error.
+    yield "done", _parse_json_output("".join(parts), agent_name)
+
+async def _generate_json(prompt: str, model_provider: str, agent_name: str, max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS, temperature: Optional[float] = None, system_instruction: Optional[str] = None, gemini_model: str = GEMINI_MODEL, response_schema: Optional[Dict] = None) -> Dict:
+    """
+    Sends a JSON-mode prompt to the chosen provider and returns the parsed object.
+    `gemini_model` and `response_schema` only apply to Gemini; OpenRouter uses plain JSON mode.
+    """
+    call_kwargs = dict(is_json_output=True, max_output_tokens=max_output_tokens, temperature=temperature, system_instruction=system_instruction)
+    if model_provider == "chatgpt":
+        generated_content_str = await call_openrouter_api(prompt, **call_kwargs)
+    else: # Default to gemini
+        generated_content_str = await call_gemini_api(prompt, model_name=gemini_model, response_schema=response_schema, **call_kwargs)
+
+    return _parse_json_output(generated_content_str, agent_name)
+
+# Output token caps per resume section; the whole tailored resume fits in their sum.
+_TAILOR_MAX_TOKENS = {"summary": 80, "skills": 512, "experience": 2048, "projects": 1024}
+
+@functools.lru_cache(maxsize=32)
+def _load_resume(resume_yaml: str) -> Dict:
+    """Parses a resume once per distinct text; callers only read from the result."""
+    return yaml.load(resume_yaml, Loader=YAML_LOADER) or {}
+
+@functools.lru_cache(maxsize=128)
+def _resume_slice(resume_yaml: str, *keys: str) -> str:
+    """
+    Dumps only the given top-level sections of the resume back to YAML. Memoized, since
+    the same base resume is sliced the same few ways for every job it is tailored to.
+    """
+    resume_data = _load_resume(resume_yaml)
+    return yaml.dump({k: resume_data[k] for k in keys if k in resume_data}, Dumper=YAML_DUMPER, sort_keys=False, allow_unicode=True, width=9999)
+
+@functools.lru_cache(maxsize=32)
+def _compact_yaml(resume_yaml: str) -> str:
+    """
+    Round-trips a resume through the YAML parser to drop comments and blank lines, and
+    stops long strings being folded across lines; trims the prompt without changing content.
+    """
+    try:
+        resume_data = yaml.load(resume_yaml, Loader=YAML_LOADER)
+    except yaml.YAMLError:
+        return resume_yaml
+    return yaml.dump(resume_data, Dumper=YAML_DUMPER, sort_keys=False, allow_unicode=True, width=9999)
+
+class _SubPrompt(NamedTuple):
+    system_instruction: str
+    prompt: str
+    max_tokens: int
+    temperature: Optional[float]
+    gemini_model: str
+    response_schema: Optional[Dict]
+
+def _tailor_prompts(jd_text: str, fixed_resume_yaml: str) -> List[_SubPrompt]:
+    """
+    Builds the summary, skills, experience and projects sub-prompts, in that order. The summary
+    and skills are short, constrained outputs, so they go to the faster model; the bullet
+    writing stays on the full one.
+    """
+    return [
+        _SubPrompt(PROMPT_SUMMARY, _TAILOR_INPUTS.format(jd_text=jd_text, context_yaml=_resume_slice(fixed_resume_yaml, "skills", "experience", "projects")), _TAILOR_MAX_TOKENS["summary"], 0.2, GEMINI_FAST_MODEL, _SUMMARY_SCHEMA),
+        _SubPrompt(PROMPT_SKILLS, _TAILOR_INPUTS.format(jd_text=jd_text, context_yaml=_resume_slice(fixed_resume_yaml, "skills")), _TAILOR_MAX_TOKENS["skills"], 0.2, GEMINI_FAST_MODEL, None),
+        _SubPrompt(PROMPT_EXPERIENCE, _TAILOR_INPUTS.format(jd_text=jd_text, context_yaml=_resume_slice(fixed_resume_yaml, "experience")), _TAILOR_MAX_TOKENS["experience"], None, GEMINI_MODEL, _EXPERIENCE_SCHEMA),
+        _SubPrompt(PROMPT_PROJECTS, _TAILOR_INPUTS.format(jd_text=jd_text, context_yaml=_resume_slice(fixed_resume_yaml, "projects")), _TAILOR_MAX_TOKENS["projects"], None, GEMINI_MODEL, _PROJECTS_SCHEMA),
+    ]
+
+# Sends the four tailoring sections as one Gemini request instead of four concurrent
+# ones. Slower end to end, but a quarter of the requests against per-minute quotas.
+RESUME_TAILOR_SINGLE_CALL = os.getenv("RESUME_TAILOR_SINGLE_CALL", "").lower() in ("1", "true", "yes")
+
+def _tailor_in_one_call(model_provider: str) -> bool:
+    # gpt-3.5-turbo's output window is too small for all four sections at once.
+    return RESUME_TAILOR_SINGLE_CALL and model_provider != "chatgpt"
+
+async def _tailor_single(jd_text: str, fixed_resume_yaml: str) -> Optional[Dict]:
+    """Tailors all four sections in one call via the batch prompt; None if the reply is malformed."""
+    results = await _tailor_batch([_batch_job_block(1, jd_text, fixed_resume_yaml)])
+    return results[0] if results else None
+
+async def agent_resume_tailor(jd_text: str, fixed_resume_yaml: str, model_provider: str = "gemini") -> Dict:
+    """
+    The Resume Tailoring Agent. It receives fixed resume data (with context) and a job description,
+    and returns only the AI-generated content in a structured format.
+
+    The summary, skills, experience and projects are generated by four concurrent
+    sub-prompts and merged here, so latency tracks the slowest one rather than the sum.
+    """
+    cache_key = _agent_cache_key("resume_tailor", model_provider, jd_text, fixed_resume_yaml)
+    cached = await get_cached_response(cache_key)
+    if cached is not None:
+        return orjson.loads(cached)
+
+    if _tailor_in_one_call(model_provider):
+        generated_data = await _tailor_single(jd_text, fixed_resume_yaml)
+        if generated_data is not None:
+            await set_cached_response(cache_key, orjson.dumps(generated_data).decode())
+            return generated_data
+
+    prompts = _tailor_prompts(jd_text, fixed_resume_yaml)
+    summary, skills, experience, projects = await asyncio.gather(
+        *(
+            _generate_json(p.prompt, model_provider, "resume tailoring", p.max_tokens, p.temperature, p.system_instruction, p.gemini_model, p.response_schema)
+            for p in prompts
+        )
+    )
+
+    generated_data = {}
+    for fragment in (summary, skills, experience, projects):
+        generated_data.update(fragment)
+    await set_cached_response(cache_key, orjson.dumps(generated_data).decode())
+    return generated_data
+
+async def agent_resume_tailor_stream(jd_text: str, fixed_resume_yaml: str, model_provider: str = "gemini") -> AsyncIterator[Dict]:
+    """
+    Streaming variant of agent_resume_tailor. Yields each generated section (e.g.
+    {"summary": ...}) as soon as its sub-prompt finishes, then caches the merged result.
+    """
+    cache_key = _agent_cache_key("resume_tailor", model_provider, jd_text, fixed_resume_yaml)
+    cached = await get_cached_response(cache_key)
+    if cached is not None:
+        yield orjson.loads(cached)
+        return
+
+    if _tailor_in_one_call(model_provider):
+        generated_data = await _tailor_single(jd_text, fixed_resume_yaml)
+        if generated_data is not None:
+            yield generated_data
+            await set_cached_response(cache_key, orjson.dumps(generated_data).decode())
+            return
+
+    tasks = [
+        asyncio.ensure_future(_generate_json(p.prompt, model_provider, "resume tailoring", p.max_tokens, p.temperature, p.system_instruction, p.gemini_model, p.response_schema))
+        for p in _tailor_prompts(jd_text, fixed_resume_yaml)
+    ]
+    generated_data = {}
+    try:
+        for next_fragment in asyncio.as_completed(tasks):
+            fragment = await next_fragment
+            generated_data.update(fragment)
+            yield fragment
+    finally:
+        # Stop outstanding sub-prompts if the client disconnects mid-stream.
+        for task in tasks:
+            task.cancel()
+
+    await set_cached_response(cache_key, orjson.dumps(generated_data).decode())
+
+# Sizing for batched tailoring. Prompt size is estimated at ~4 characters per token,
+# which is close enough for budgeting without a tokenizer round-trip.
+BATCH_PROMPT_TOKEN_BUDGET = int(os.getenv("BATCH_PROMPT_TOKEN_BUDGET", "200000"))
+BATCH_OUTPUT_TOKEN_BUDGET = 65536 # Gemini 2.5 Pro's output ceiling
+_TAILOR_OUTPUT_TOKENS = sum(_TAILOR_MAX_TOKENS.values())
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+def _batch_job_block(index: int, jd_text: str, fixed_resume_yaml: str) -> str:
+    return _BATCH_JOB_BLOCK.format(index=index, jd_text=jd_text, context_yaml=_resume_slice(fixed_resume_yaml, "skills", "experience", "projects"))
+
+def _plan_batches(job_blocks: List[str]) -> List[List[int]]:
+    """Greedily groups job indices so each batch fits both the prompt and the output token budgets."""
+    fixed_tokens = _estimate_tokens(_BATCH_TAILOR_HEADER + _SUMMARY_TASK + _SKILLS_TASK + _EXPERIENCE_TASK + _PROJECTS_TASK)
+    max_jobs = max(1, (BATCH_OUTPUT_TOKEN_BUDGET - GEMINI_THINKING_HEADROOM) // _TAILOR_OUTPUT_TOKENS)
+    batches, current, current_tokens = [], [], fixed_tokens
+    for index, block in enumerate(job_blocks):
+        block_tokens = _estimate_tokens(block)
+        if current and (len(current) >= max_jobs or current_tokens + block_tokens > BATCH_PROMPT_TOKEN_BUDGET):
+            batches.append(current)
+            current, current_tokens = [], fixed_tokens
+        current.append(index)
+        current_tokens += block_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+async def _tailor_batch(job_blocks: List[str]) -> Optional[List[Dict]]:
+    """Runs one packed Gemini call; returns None if the reply is not one object per job."""
+    prompt = (
+        _BATCH_TAILOR_HEADER.format(job_count=len(job_blocks))
+        + "".join(job_blocks)
+        + _SUMMARY_TASK + _SKILLS_TASK + _EXPERIENCE_TASK + _PROJECTS_TASK
+    )
+    max_output_tokens = len(job_blocks) * _TAILOR_OUTPUT_TOKENS + GEMINI_THINKING_HEADROOM
+    generated_content_str = await call_gemini_api(prompt, is_json_output=True, max_output_tokens=max_output_tokens)
+    try:
+        results = orjson.loads(_strip_fences(generated_content_str))
+    except orjson.JSONDecodeError as e:
+        print(f"Batch tailoring returned malformed JSON, falling back to per-job calls: {e}")
+        return None
+    if not isinstance(results, list) or len(results) != len(job_blocks) or not all(isinstance(r, dict) for r in results):
+        print("Batch tailoring returned the wrong number of results, falling back to per-job calls.")
+        return None
+    return results
+
+async def agent_resume_tailor_batch(jobs: List[Tuple[str, str]], model_provider: str = "gemini") -> List[Dict]:
+    """
+    Tailors the resume for several (jd_text, fixed_resume_yaml) pairs, returning results in input order.
+
+    On Gemini, uncached jobs are packed into as few calls as the token budgets allow, and any
+    batch that comes back malformed is retried job by job. OpenRouter's gpt-3.5-turbo cannot fit
+    more than one job in its output window, so it always goes through agent_resume_tailor.
+    """
+    cache_keys = [_agent_cache_key("resume_tailor", model_provider, jd_text, fixed_resume_yaml) for jd_text, fixed_resume_yaml in jobs]
+    cached = await asyncio.gather(*(get_cached_response(key) for key in cache_keys))
+    results: List[Optional[Dict]] = [orjson.loads(hit) if hit is not None else None for hit in cached]
+    pending = [i for i, result in enumerate(results) if result is None]
+
+    if model_provider != "chatgpt" and len(pending) > 1:
+        job_blocks = [_batch_job_block(n + 1, *jobs[i]) for n, i in enumerate(pending)]
+        batches = [[pending[b] for b in batch] for batch in _plan_batches(job_blocks)]
+        # Re-number the jobs so each batch's prompt counts from 1.
+        batch_outputs = await asyncio.gather(*(
+            _tailor_batch([_batch_job_block(n + 1, *jobs[i]) for n, i in enumerate(batch_jobs)])
+            for batch_jobs in batches
+        ))
+        for batch_jobs, batch_results in zip(batches, batch_outputs):
+            if batch_results is None:
+                continue
+            for i, generated_data in zip(batch_jobs, batch_results):
+                results[i] = generated_data
+                await set_cached_response(cache_keys[i], orjson.dumps(generated_data).decode())
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    fallback = await asyncio.gather(*(agent_resume_tailor(jobs[i][0], jobs[i][1], model_provider) for i in missing))
+    for i, generated_data in zip(missing, fallback):
+        results[i] = generated_data
+    return results
+
+@functools.lru_cache(maxsize=64)
+def _render_context(jd_text: str, resume_yaml: str) -> str:
+    """Renders the resume + job description block once, so the email and cover letter agents share it."""
+    return _APPLICATION_CONTEXT.format(resume_yaml=_compact_yaml(resume_yaml).rstrip(), jd_text=jd_text)
+
+def _cold_email_request(company_name: str, role_title: str, recruiter_name: str, recipient_linkedin_url: str, resume_yaml: str, jd_text: str, additional_details: str, model_provider: str) -> Tuple[CacheKey, str]:
+    """Returns the (cache_key, user prompt) pair shared by the buffered and streaming email agents; the instructions go in _COLD_EMAIL_SYSTEM."""
+    cache_key = _agent_cache_key(
+        "cold_email", model_provider, jd_text, company_name, role_title, recruiter_name or "",
+        recipient_linkedin_url or "", resume_yaml, additional_details or ""
+    )
+    prompt = _COLD_EMAIL_INPUTS.format(
+        company_name=company_name,
+        role_title=role_title,
+        recruiter_name=recruiter_name or "Not Provided",
+        recipient_linkedin_url=recipient_linkedin_url or "Not Provided",
+        additional_details=additional_details or "None",
+        application_context=_render_context(jd_text, resume_yaml),
+    )
+    return cache_key, prompt
+
+async def agent_cold_email_generator(company_name: str, role_title: str, recruiter_name: str, recipient_linkedin_url: str, resume_yaml: str, jd_text: str, additional_details: str, model_provider: str = "gemini") -> Dict:
+    """
+    The Cold Email Agent. It receives contact/job info and a finalized resume,
+    researches online, and generates a personalized cold email with `subject` and `body` keys.
+    """
+    cache_key, prompt = _cold_email_request(company_name, role_title, recruiter_name, recipient_linkedin_url, resume_yaml, jd_text, additional_details, model_provider)
+    cached = await get_cached_response(cache_key)
+    if cached is not None:
+        return orjson.loads(cached)
+
+    # Streamed so the parsed email is returned as soon as its closing brace arrives;
+    # closing the stream on return frees the provider slot right away.
+    async with _aclosing(_stream_json(prompt, model_provider, "email generation", _COLD_EMAIL_SYSTEM, COLD_EMAIL_MAX_TOKENS, _COLD_EMAIL_SCHEMA)) as events:
+        async for kind, payload in events:
+            if kind == "done":
+                await set_cached_response(cache_key, orjson.dumps(payload).decode())
+                return payload
+
+async def agent_cold_email_generator_stream(company_name: str, role_title: str, recruiter_name: str, recipient_linkedin_url: str, resume_yaml: str, jd_text: str, additional_details: str, model_provider: str = "gemini") -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of agent_cold_email_generator. Yields ("chunk", text) pairs as the
+    model produces output, then a final ("done", email_content) once it has been parsed and cached.
+    """
+    cache_key, prompt = _cold_email_request(company_name, role_title, recruiter_name, recipient_linkedin_url, resume_yaml, jd_text, additional_details, model_provider)
+    cached = await get_cached_response(cache_key)
+    if cached is not None:
+        yield "chunk", cached
+        yield "done", orjson.loads(cached)
+        return
+
+    async for kind, payload in _stream_json(prompt, model_provider, "email generation", _COLD_EMAIL_SYSTEM, COLD_EMAIL_MAX_TOKENS, _COLD_EMAIL_SCHEMA):
+        if kind == "done":
+            await set_cached_response(cache_key, orjson.dumps(payload).decode())
+        yield kind, payload
+
+def _cover_letter_request(resume_yaml: str, jd_text: str, additional_details: str, model_provider: str) -> Tuple[CacheKey, str]:
+    """Returns the (cache_key, user prompt) pair shared by the buffered and streaming cover letter agents; the instructions go in _COVER_LETTER_SYSTEM."""
+    cache_key = _agent_cache_key("cover_letter", model_provider, jd_text, resume_yaml, additional_details or "")
+    prompt = _COVER_LETTER_INPUTS.format(
+        application_context=_render_context(jd_text, resume_yaml),
+        additional_details=additional_details or "None",
+    )
+    return cache_key, prompt
+
+async def agent_cover_letter_generator(resume_yaml: str, jd_text: str, additional_details: str, model_provider: str = "gemini") -> Dict:
+    """
+    The Cover Letter Agent. It receives a finalized resume, job description, and user notes
+    to generate a tailored cover letter.
+    """
+    cache_key, prompt = _cover_letter_request(resume_yaml, jd_text, additional_details, model_provider)
+    cached = await get_cached_response(cache_key)
+    if cached is not None:
+        return orjson.loads(cached)
+
+    cover_letter_content = await _generate_json(prompt, model_provider, "cover letter generation", COVER_LETTER_MAX_TOKENS, system_instruction=_COVER_LETTER_SYSTEM, response_schema=_COVER_LETTER_SCHEMA)
+    await set_cached_response(cache_key, orjson.dumps(cover_letter_content).decode())
+    return cover_letter_content
+
+async def agent_cover_letter_generator_stream(resume_yaml: str, jd_text: str, additional_details: str, model_provider: str = "gemini") -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of agent_cover_letter_generator. Yields ("chunk", text) pairs as the
+    model produces output, then a final ("done", cover_letter_content) once it has been parsed and cached.
+    """
+    cache_key, prompt = _cover_letter_request(resume_yaml, jd_text, additional_details, model_provider)
+    cached = await get_cached_response(cache_key)
+    if cached is not None:
+        yield "chunk", cached
+        yield "done", orjson.loads(cached)
+        return
+
+    async for kind, payload in _stream_json(prompt, model_provider, "cover letter generation", _COVER_LETTER_SYSTEM, COVER_LETTER_MAX_TOKENS, _COVER_LETTER_SCHEMA):
+        if kind == "done":
+            await set_cached_response(cache_key, orjson.dumps(payload).decode())
+        yield kind, payload
+
+async def run_full_pipeline(jd_text: str, fixed_resume_yaml: str, resume_yaml: str, company_name: str, role_title: str, recruiter_name: str, recipient_linkedin_url: str, email_additional_details: str, cover_letter_additional_details: str, model_provider: str = "gemini") -> Tuple[Dict, Dict, Dict]:
+    """
+    Runs the resume tailor, cold email and cover letter agents for one job concurrently.
+    The email and cover letter are written from `resume_yaml` (the finalized resume), since
+    they cannot wait on the tailored one. Provider concurrency is still capped by the
+    per-provider semaphores, so this only overlaps calls that fit under those limits.
+    """
+    return await asyncio.gather(
+        agent_resume_tailor(jd_text, fixed_resume_yaml, model_provider),
+        agent_cold_email_generator(company_name, role_title, recruiter_name, recipient_linkedin_url, resume_yaml, jd_text, email_additional_details, model_provider),
+        agent_cover_letter_generator(resume_yaml, jd_text, cover_letter_additional_details, model_provider),
+    )
@@ -1,26 +1,31 @@
 import os
 import yaml
 import re
-import json
+import orjson
 import uuid
-import copy
+import hashlib
 import shutil
+import asyncio
+import functools
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Optional
-from bs4 import BeautifulSoup
+from typing import Dict, Any, FrozenSet, List, NamedTuple, Optional, Tuple
 from dotenv import load_dotenv
 
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate
-from reportlab.lib.units import inch
-
-from utils import get_app_id, APPLICATIONS_DIR, BASE_RESUME_PATH, load_variables, merge_variables
-from llm_services import agent_resume_tailor, agent_cold_email_generator, agent_cover_letter_generator
-from pdf_services import ATSResumePDFGenerator, CoverLetterPDFGenerator
+from utils import get_app_id, make_safe_name, APPLICATIONS_DIR, BASE_RESUME_PATH, VARIABLES_PATH, YAML_LOADER, YAML_DUMPER, load_base_resume, load_variables, merge_variables, read_yaml_file
+from llm_services import (
+    agent_resume_tailor, agent_resume_tailor_stream, agent_resume_tailor_batch, agent_cold_email_generator,
+    agent_cold_email_generator_stream, agent_cover_letter_generator, agent_cover_letter_generator_stream, run_full_pipeline,
+    warm_up_http_clients, close_http_clients
+)
+# reportlab (via pdf_services) and bs4 are imported inside the routes that use them,
+# so startup and the listing/detail endpoints don't pay for loading them.
 
 load_dotenv()
 
@@ -35,6 +40,9 @@ app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True
 
 TRACKER_APPS_PATH = os.path.join(APPLICATIONS_DIR, "tracker_applications.json")
 TRACKER_EMAILS_PATH = os.path.join(APPLICATIONS_DIR, "tracker_emails.json")
+# Preview PDFs render in worker processes: reportlab is pure Python, so renders on threads
+# serialize on the GIL. 0 renders on the threadpool instead.
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(os.cpu_count() or 1)))
 
 class ApplicationData(BaseModel):
     companyName: str
@@ -48,6 +56,10 @@ class JobDescriptionData(BaseModel):
 class GenerateResumeRequest(BaseModel):
     modelProvider: str
 
+class BatchGenerateResumeRequest(BaseModel):
+    appIds: List[str]
+    modelProvider: str
+
 class RenderRequestData(BaseModel):
     resumeYaml: str
     variables: Optional[Dict[str, Any]] = Field(None, description="Optional override for formatting variables")
@@ -79,6 +91,15 @@ class CoverLetterGenerationRequest(BaseModel):
     modelProvider: str
     contactEmail: Optional[str] = ""
 
+class FullPipelineRequest(BaseModel):
+    recruiterName: Optional[str] = ""
+    recruiterEmail: Optional[str] = ""
+    recruiterLinkedIn: Optional[str] = ""
+    additionalDetails: Optional[str] = ""
+    coverLetterAdditionalDetails: Optional[str] = ""
+    contactEmail: Optional[str] = ""
+    modelProvider: str
+
 class SaveCoverLetterRequest(BaseModel):
     coverLetterText: str
 
@@ -118,34 +139,88 @@ class TrackEmailRequest(BaseModel):
     recruiterName: str
     recruiterEmail: str
 
+class AppPaths(NamedTuple):
+    path: str
+    files: FrozenSet[str] # Entry names present when the directory was resolved
+
+    def join(self, filename: str) -> str:
+        return os.path.join(self.path, filename)
+
+def resolve_app(app_id: str) -> AppPaths:
+    """Lists the application directory once so existence checks become set lookups; 404s if it's missing."""
+    app_path = os.path.join(APPLICATIONS_DIR, app_id)
+    try:
+        with os.scandir(app_path) as entries:
+            files = frozenset(entry.name for entry in entries)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="Application not found.")
+    return AppPaths(app_path, files)
+
+# --- Conditional GETs ---
+# The read endpoints tag responses with a hash of the stat results they depend on, so a
+# client revalidating an unchanged resource gets a 304 without any files being read.
+def _etag(*parts: Any) -> str:
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest() + '"'
+
+def _file_etag(path: str) -> str:
+    st = os.stat(path)
+    return _etag(st.st_mtime_ns, st.st_size)
+
+def _dir_etag(path: str) -> str:
+    """Covers every entry in the directory, so in-place file edits count as well as additions."""
+    with os.scandir(path) as entries:
+        stats = [(entry.name, entry.stat()) for entry in entries]
+    return _etag(sorted((name, st.st_mtime_ns, st.st_size) for name, st in stats))
+
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Tags the response with the ETag and returns a 304 to send instead if the client's copy is current."""
+    response.headers["ETag"] = etag
+    if_none_match = request.headers.get("if-none-match", "")
+    if any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
 def update_application_timestamp(app_id: str):
     """Updates the modification time of the application directory."""
     app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if os.path.isdir(app_path):
-        try:
-            os.utime(app_path, None)
-        except OSError as e:
-            print(f"Could not update timestamp for {app_path}: {e}")
+    try:
+        os.utime(app_path, None)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Could not update timestamp for {app_path}: {e}")
 
-def get_resume_versions(app_path: str) -> List[str]:
-    if not os.path.isdir(app_path):
-        return []
-    
-    version_pattern = re.compile(r'^tailored_resume_v(\d+)\.yaml$')
+_VERSION_RE = re.compile(r'^tailored_resume_v(\d+)\.yaml$')
+
+def _list_resume_versions(app_path: str) -> Tuple[Tuple[str, ...], int]:
+    """Lists the resume versions newest first, plus the highest version number (0 if none)."""
     versions = []
-    for f in os.listdir(app_path):
-        match = version_pattern.match(f)
-        if match:
-            versions.append((int(match.group(1)), f))
-            
+    has_unversioned = False
+    with os.scandir(app_path) as entries:
+        for entry in entries:
+            match = _VERSION_RE.match(entry.name)
+            if match:
+                versions.append((int(match.group(1)), entry.name))
+            elif entry.name == "tailored_resume.yaml":
+                has_unversioned = True
+
     versions.sort(key=lambda x: x[0], reverse=True)
     sorted_filenames = [filename for _, filename in versions]
-
-    unversioned_path = os.path.join(app_path, "tailored_resume.yaml")
-    if os.path.exists(unversioned_path) and "tailored_resume.yaml" not in sorted_filenames:
+    if has_unversioned:
         sorted_filenames.append("tailored_resume.yaml")
-        
-    return sorted_filenames
+
+    return tuple(sorted_filenames), versions[0][0] if versions else 0
+
+@functools.lru_cache(maxsize=64)
+def _scan_resume_versions(app_path: str, dir_mtime_ns: int) -> Tuple[str, ...]:
+    """The version listing, cached on the directory's mtime; only for read-only callers."""
+    return _list_resume_versions(app_path)[0]
+
+def get_resume_versions(app_path: str) -> List[str]:
+    try:
+        return list(_scan_resume_versions(app_path, os.stat(app_path).st_mtime_ns))
+    except (FileNotFoundError, NotADirectoryError):
+        return []
 
 def merge_resume_data(fixed_data: Dict, generated_data: Dict) -> Dict:
     final_resume = fixed_data.copy()
@@ -159,45 +234,82 @@ def merge_resume_data(fixed_data: Dict, generated_data: Dict) -> Dict:
         final_resume['skills'] = fixed_data['skills']
 
     if 'experience_bullets' in generated_data and 'experience' in final_resume:
-        for i, exp_bullets in enumerate(generated_data['experience_bullets']):
-            if i < len(final_resume['experience']):
-                final_resume['experience'][i]['bullets'] = exp_bullets.get('bullets', [])
+        # New entry dicts rather than writing into the shared ones, so the base resume is never mutated.
+        new_bullets = generated_data['experience_bullets']
+        final_resume['experience'] = [
+            {**exp, 'bullets': new_bullets[i].get('bullets', [])} if i < len(new_bullets) else exp
+            for i, exp in enumerate(final_resume['experience'])
+        ]
 
     if 'projects_reordered' in generated_data:
         final_resume['projects'] = generated_data['projects_reordered']
 
     return final_resume
 
+def read_json(path: str) -> Any:
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+def _write_atomic(path: str, content: bytes):
+    """Writes to a temporary file that then replaces the target."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'xb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_json(path: str, data: Any):
+    """Writes indented UTF-8 JSON, the same layout json.dump(indent=2) produced."""
+    _write_atomic(path, orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+def write_text(path: str, text: str):
+    _write_atomic(path, text.encode('utf-8'))
+
 def update_app_details(app_path: str, new_details: Dict):
     details_path = os.path.join(app_path, "app_details.json")
-    details = {}
-    if os.path.exists(details_path):
-        with open(details_path, 'r') as f:
-            try:
-                details = json.load(f)
-            except json.JSONDecodeError:
-                details = {}
+    try:
+        details = read_json(details_path)
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        details = {}
     details.update(new_details)
-    with open(details_path, 'w') as f:
-        json.dump(details, f, indent=2)
+    write_json(details_path, details)
+
+def _read_app_details(app_path: str) -> Dict:
+    """Reads app_details.json, checking whether the application itself exists only when the read fails."""
+    try:
+        return read_json(os.path.join(app_path, "app_details.json"))
+    except FileNotFoundError:
+        detail = "Application details not found." if os.path.isdir(app_path) else "Application not found."
+        raise HTTPException(status_code=404, detail=detail)
+
+def _update_app_details_or_404(app_path: str, new_details: Dict):
+    try:
+        update_app_details(app_path, new_details)
+    except FileNotFoundError: # The directory itself is gone, so the temp file couldn't be created
+        raise HTTPException(status_code=404, detail="Application not found.")
 
 def read_tracker_data(path: str) -> List[Dict]:
     if not os.path.exists(path):
         return []
-    with open(path, 'r') as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
+    try:
+        return read_json(path)
+    except orjson.JSONDecodeError:
+        return []
 
 def write_tracker_data(path: str, data: List[Dict]):
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=2)
+    write_json(path, data)
 
 def filter_resume_data(data: Dict, selections: Dict) -> Dict:
-    filtered_data = copy.deepcopy(data)
+    # Only the top level and the contact block are rewritten here; the PDF generator
+    # deep-copies whatever it trims, so a full deepcopy up front is wasted work.
+    filtered_data = dict(data)
 
     if 'contact' in filtered_data:
+        filtered_data['contact'] = dict(filtered_data['contact'])
         if 'contact-email' in selections:
             filtered_data['contact']['email'] = selections['contact-email']
         if 'contact-location' in selections:
@@ -227,50 +339,74 @@ def filter_resume_data(data: Dict, selections: Dict) -> Dict:
     return filtered_data
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     if not os.path.exists(APPLICATIONS_DIR): os.makedirs(APPLICATIONS_DIR)
     if not os.path.exists(BASE_RESUME_PATH): raise FileNotFoundError(f"Base resume not found at '{BASE_RESUME_PATH}'")
+    load_base_resume() # Parse it up front so the first generation doesn't pay for it
+    # Runs in the background so a slow or unreachable provider doesn't delay startup.
+    app.state.warm_up_task = asyncio.create_task(warm_up_http_clients())
+    # spawn rather than fork, since forking a process that already runs threads can deadlock.
+    app.state.pdf_pool = ProcessPoolExecutor(PDF_RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn")) if PDF_RENDER_WORKERS > 0 else None
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await close_http_clients()
+    if app.state.pdf_pool is not None:
+        await asyncio.to_thread(app.state.pdf_pool.shutdown, cancel_futures=True)
 
 @app.get("/default-variables", response_model=Dict)
-def get_default_variables():
+def get_default_variables(request: Request, response: Response):
+    try:
+        etag = _file_etag(VARIABLES_PATH)
+    except FileNotFoundError:
+        etag = _etag(None) # The built-in fallback defaults
+    not_modified = _not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
     return load_variables()
 
 @app.get("/applications", response_model=List[Dict[str, Any]])
-def get_applications():
+def get_applications(request: Request, response: Response):
     apps = []
     if not os.path.exists(APPLICATIONS_DIR): return []
-    
-    app_dirs = [d for d in os.listdir(APPLICATIONS_DIR) if os.path.isdir(os.path.join(APPLICATIONS_DIR, d))]
 
-    for app_id in app_dirs:
-        app_path = os.path.join(APPLICATIONS_DIR, app_id)
-        details_path = os.path.join(app_path, "app_details.json")
-        
-        if os.path.exists(details_path):
-            with open(details_path, 'r') as f:
-                details = json.load(f)
-            
-            created_at = os.path.getmtime(app_path)
+    # scandir's entries carry the file type from the directory read, so is_dir() needs no extra stat.
+    with os.scandir(APPLICATIONS_DIR) as entries:
+        app_dirs = [entry for entry in entries if entry.is_dir()]
+
+    # Details are written by replacing the file, which bumps its directory's mtime, so the
+    # directory stats alone tell whether the listing changed.
+    not_modified = _not_modified(request, response, _etag(sorted((entry.name, entry.stat().st_mtime_ns) for entry in app_dirs)))
+    if not_modified:
+        return not_modified
+
+    for entry in app_dirs:
+        app_id = entry.name
+        details_path = os.path.join(entry.path, "app_details.json")
+        created_at = entry.stat().st_mtime
+
+        try:
+            details = read_json(details_path)
+        except FileNotFoundError:
+            if '_' not in app_id:
+                continue
+            company_part, role_part = app_id.rsplit('_', 1)
             apps.append({
                 "appId": app_id, 
-                "company": details.get("companyName"), 
-                "role": details.get("roleTitle"),
-                "jobId": details.get("jobId"),
+                "company": company_part.replace('_', ' '), 
+                "role": role_part.replace('_', ' '),
+                "jobId": "",
                 "createdAt": created_at 
             })
-        else:
-            try:
-                company_part, role_part = app_id.rsplit('_', 1)
-                created_at = os.path.getmtime(app_path)
-                apps.append({
-                    "appId": app_id, 
-                    "company": company_part.replace('_', ' '), 
-                    "role": role_part.replace('_', ' '),
-                    "jobId": "",
-                    "createdAt": created_at 
-                })
-            except ValueError:
-                continue
+            continue
+
+        apps.append({
+            "appId": app_id, 
+            "company": details.get("companyName"), 
+            "role": details.get("roleTitle"),
+            "jobId": details.get("jobId"),
+            "createdAt": created_at 
+        })
             
     apps.sort(key=lambda x: x['createdAt'], reverse=True)
     return apps
@@ -283,55 +419,52 @@ def create_application(data: ApplicationData):
     os.makedirs(app_path)
     
     details_path = os.path.join(app_path, "app_details.json")
-    with open(details_path, 'w') as f:
-        json.dump(data.dict(), f, indent=2)
+    write_json(details_path, data.model_dump())
 
     return {"message": "Application created successfully", "appId": app_id}
 
 @app.get("/applications/{app_id}", response_model=Dict[str, Any])
-def get_application_details(app_id: str):
-    app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path): raise HTTPException(status_code=404, detail="Application not found.")
-    
-    details_path = os.path.join(app_path, "app_details.json")
-    jd_path = os.path.join(app_path, "job_description.html")
+def get_application_details(app_id: str, request: Request, response: Response):
+    try:
+        etag = _dir_etag(os.path.join(APPLICATIONS_DIR, app_id))
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="Application not found.")
+    not_modified = _not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+
+    paths = resolve_app(app_id)
     
     details = {}
-    if os.path.exists(details_path):
-        with open(details_path, 'r') as f:
-            details = json.load(f)
+    if "app_details.json" in paths.files:
+        details = read_json(paths.join("app_details.json"))
 
-    resume_versions = get_resume_versions(app_path)
+    resume_versions = get_resume_versions(paths.path)
     
     finalized_base_version = details.get("finalizedBaseVersion")
-    if finalized_base_version and os.path.exists(os.path.join(app_path, finalized_base_version)):
+    if finalized_base_version and finalized_base_version in paths.files:
         base_version_file = finalized_base_version
     else:
         base_version_file = resume_versions[0] if resume_versions else None
 
-    yaml_path = os.path.join(app_path, base_version_file) if base_version_file else None
-
     yaml_content = ""
-    if yaml_path and os.path.exists(yaml_path):
-        with open(yaml_path, 'r', encoding='utf-8') as f: yaml_content = f.read()
+    if base_version_file and base_version_file in paths.files:
+        with open(paths.join(base_version_file), 'r', encoding='utf-8') as f: yaml_content = f.read()
 
     jd_content = ""
-    if os.path.exists(jd_path):
-        with open(jd_path, 'r', encoding='utf-8') as f: jd_content = f.read()
+    if "job_description.html" in paths.files:
+        with open(paths.join("job_description.html"), 'r', encoding='utf-8') as f: jd_content = f.read()
 
-    finalized_yaml_path = os.path.join(app_path, "finalized_resume.yaml")
     finalized_yaml_content = ""
-    if os.path.exists(finalized_yaml_path):
-        with open(finalized_yaml_path, 'r', encoding='utf-8') as f:
+    if "finalized_resume.yaml" in paths.files:
+        with open(paths.join("finalized_resume.yaml"), 'r', encoding='utf-8') as f:
             finalized_yaml_content = f.read()
 
-    custom_vars_path = os.path.join(app_path, "custom_variables.yaml")
     custom_vars = None
-    if os.path.exists(custom_vars_path):
-        with open(custom_vars_path, 'r', encoding='utf-8') as f:
-            custom_vars = yaml.safe_load(f)
+    if "custom_variables.yaml" in paths.files:
+        custom_vars = read_yaml_file(paths.join("custom_variables.yaml"))[1]
 
-    finalized_pdf_path = os.path.join(app_path, f"Resume_{details.get('name', '').replace(' ', '_')}.pdf")
+    finalized_pdf_name = f"Resume_{details.get('name', '').replace(' ', '_')}.pdf"
     finalized_cover_letter_file = details.get("finalizedCoverLetterFile")
     
     return {
@@ -355,74 +488,115 @@ def get_application_details(app_id: str):
         "coverLetter": {
             "additionalDetails": details.get("coverLetterAdditionalDetails", ""),
             "generatedBody": details.get("generatedCoverLetterBody", ""),
-            "pdfUrl": f"/applications/{app_id}/cover-letter-pdf" if finalized_cover_letter_file and os.path.exists(os.path.join(app_path, finalized_cover_letter_file)) else None
+            "pdfUrl": f"/applications/{app_id}/cover-letter-pdf" if finalized_cover_letter_file and finalized_cover_letter_file in paths.files else None
         },
         "selectedContactEmail": details.get("selectedContactEmail", ""),
-        "finalizedPdfUrl": f"/applications/{app_id}/finalized-pdf" if os.path.exists(finalized_pdf_path) else None
+        "finalizedPdfUrl": f"/applications/{app_id}/finalized-pdf" if finalized_pdf_name in paths.files else None
     }
 
 @app.get("/applications/{app_id}/resume-content", response_model=Dict)
-def get_resume_version_content(app_id: str, filename: str):
+def get_resume_version_content(app_id: str, filename: str, request: Request, response: Response):
     app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
-    
     if ".." in filename or filename.startswith("/"):
         raise HTTPException(status_code=400, detail="Invalid filename.")
 
     file_path = os.path.join(app_path, filename)
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Resume version not found.")
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        detail = "Resume version not found." if os.path.isdir(app_path) else "Application not found."
+        raise HTTPException(status_code=404, detail=detail)
+    not_modified = _not_modified(request, response, _etag(st.st_mtime_ns, st.st_size))
+    if not_modified:
+        return not_modified
         
+    return {"resumeYaml": _read_version_text(file_path, st.st_mtime_ns, st.st_size)}
+
+@functools.lru_cache(maxsize=512)
+def _read_version_text(file_path: str, mtime_ns: int, size: int) -> str:
+    """Reads a resume version once per modification time and size."""
     with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        
-    return JSONResponse(content={"resumeYaml": content})
+        return f.read()
+
+# selectolax's lexbor backend extracts text many times faster than BeautifulSoup; when it
+# is missing, BeautifulSoup uses lxml if installed and the stdlib parser otherwise.
+_HAS_SELECTOLAX = importlib.util.find_spec("selectolax") is not None
+_HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+_NON_TEXT_TAGS = ["script", "style"]
+
+def _html_to_text(html: str) -> str:
+    if _HAS_SELECTOLAX:
+        from selectolax.lexbor import LexborHTMLParser
+        tree = LexborHTMLParser(html)
+        tree.strip_tags(_NON_TEXT_TAGS) # BeautifulSoup's get_text skips these too
+        # Whitespace-only nodes come back as empty lines; drop them to match get_text(strip=True).
+        return "\n".join(line for line in tree.root.text(separator='\n', strip=True).split('\n') if line)
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, _HTML_PARSER).get_text(separator='\n', strip=True)
+
+def _jd_text_path(jd_path: str) -> str:
+    return os.path.splitext(jd_path)[0] + ".txt"
+
+def _text_is_fresh(jd_mtime_ns: int, txt_mtime_ns: Optional[int]) -> bool:
+    return txt_mtime_ns is not None and txt_mtime_ns >= jd_mtime_ns
+
+@functools.lru_cache(maxsize=128)
+def _cached_jd_text(jd_path: str, jd_mtime_ns: int, txt_mtime_ns: Optional[int]) -> str:
+    """Reads the plain-text copy saved next to the job description, or extracts it from the HTML if that copy is missing or stale."""
+    if _text_is_fresh(jd_mtime_ns, txt_mtime_ns):
+        with open(_jd_text_path(jd_path), 'r', encoding='utf-8') as f: return f.read()
+    with open(jd_path, 'r', encoding='utf-8') as f: return _html_to_text(f.read())
+
+def _read_jd_text(jd_path: str) -> str:
+    """Keyed on both files' mtimes, so back-to-back generations for one application read the text once."""
+    jd_mtime_ns = os.stat(jd_path).st_mtime_ns
+    txt_path = _jd_text_path(jd_path)
+    try:
+        txt_mtime_ns = os.stat(txt_path).st_mtime_ns
+    except FileNotFoundError:
+        txt_mtime_ns = None
+    jd_text = _cached_jd_text(jd_path, jd_mtime_ns, txt_mtime_ns)
+    if not _text_is_fresh(jd_mtime_ns, txt_mtime_ns):
+        write_text(txt_path, jd_text)
+    return jd_text
 
 @app.post("/applications/{app_id}/job-description", response_model=Dict[str, str])
 def save_job_description(app_id: str, data: JobDescriptionData):
-    app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.exists(app_path): raise HTTPException(status_code=404, detail="Application not found.")
-    file_path = os.path.join(app_path, "job_description.html")
-    with open(file_path, 'w', encoding='utf-8') as f: f.write(data.htmlContent)
+    file_path = resolve_app(app_id).join("job_description.html")
+    write_text(file_path, data.htmlContent)
+    # Extract the plain text now so generation doesn't have to re-parse the HTML each time.
+    write_text(_jd_text_path(file_path), _html_to_text(data.htmlContent))
     update_application_timestamp(app_id)
     return {"message": "Job Description saved successfully."}
 
-@app.post("/applications/{app_id}/generate-resume", response_model=Dict[str, Any])
-def generate_resume(app_id: str, request: GenerateResumeRequest):
-    app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    jd_path = os.path.join(app_path, "job_description.html")
-    if not os.path.exists(jd_path): raise HTTPException(status_code=404, detail="Job description not found.")
+def _load_tailoring_inputs(app_id: str):
+    """Returns (app_path, fixed_resume_yaml, fixed_resume_data, jd_text) for resume generation."""
+    paths = resolve_app(app_id)
+    if "job_description.html" not in paths.files: raise HTTPException(status_code=404, detail="Job description not found.")
 
-    with open(BASE_RESUME_PATH, 'r', encoding='utf-8') as f:
-        fixed_resume_yaml = f.read()
-        fixed_resume_data = yaml.safe_load(fixed_resume_yaml)
+    fixed_resume_yaml, fixed_resume_data = load_base_resume()
 
-    with open(jd_path, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
-        jd_text = soup.get_text(separator='\n', strip=True)
+    jd_text = _read_jd_text(paths.join("job_description.html"))
 
-    generated_content_str = agent_resume_tailor(jd_text, fixed_resume_yaml, request.modelProvider)
-    
-    try:
-        generated_data = yaml.safe_load(generated_content_str)
-    except yaml.YAMLError as e:
-        raise HTTPException(status_code=500, detail="Failed to parse LLM-generated resume content.")
+    return paths.path, fixed_resume_yaml, fixed_resume_data, jd_text
 
+def _save_tailored_resume(app_id: str, app_path: str, fixed_resume_data: Dict, generated_data: Dict) -> Dict[str, Any]:
+    """Merges generated content into the base resume and writes it as the next version."""
     final_resume_data = merge_resume_data(fixed_resume_data, generated_data)
-    final_resume_yaml = yaml.dump(final_resume_data, sort_keys=False, allow_unicode=True)
-
-    resume_versions = get_resume_versions(app_path)
-    version_numbers = [int(re.search(r'_v(\d+)\.yaml$', f).group(1)) for f in resume_versions if re.search(r'_v(\d+)\.yaml$', f)]
-    new_version_num = max(version_numbers) + 1 if version_numbers else 1
-    new_resume_filename = f"tailored_resume_v{new_version_num}.yaml"
-    yaml_path = os.path.join(app_path, new_resume_filename)
+    final_resume_yaml = yaml.dump(final_resume_data, Dumper=YAML_DUMPER, sort_keys=False, allow_unicode=True)
 
-    with open(yaml_path, 'w', encoding='utf-8') as f:
-        f.write(final_resume_yaml)
+    new_version_num = _list_resume_versions(app_path)[1] + 1
+    while True: # 'x' so a concurrent save of the same application can never overwrite a version
+        new_resume_filename = f"tailored_resume_v{new_version_num}.yaml"
+        try:
+            with open(os.path.join(app_path, new_resume_filename), 'x', encoding='utf-8') as f:
+                f.write(final_resume_yaml)
+            break
+        except FileExistsError:
+            new_version_num += 1
 
     update_application_timestamp(app_id)
-    updated_versions = get_resume_versions(app_path)
+    updated_versions = list(_list_resume_versions(app_path)[0])
 
     return {
         "message": f"Generated new resume version (v{new_version_num})",
@@ -431,64 +605,165 @@ def generate_resume(app_id: str, request: GenerateResumeRequest):
         "resumeVersions": updated_versions
     }
 
+def _sse(data: Any, event: Optional[str] = None) -> str:
+    """Formats one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {orjson.dumps(data).decode()}\n\n"
+
+@app.post("/applications/{app_id}/generate-resume", response_model=Dict[str, Any])
+async def generate_resume(app_id: str, request: GenerateResumeRequest):
+    app_path, fixed_resume_yaml, fixed_resume_data, jd_text = await asyncio.to_thread(_load_tailoring_inputs, app_id)
+
+    generated_data = await agent_resume_tailor(jd_text, fixed_resume_yaml, request.modelProvider)
+    return await asyncio.to_thread(_save_tailored_resume, app_id, app_path, fixed_resume_data, generated_data)
+
+@app.post("/applications/generate-resume-batch", response_model=List[Dict[str, Any]])
+async def generate_resume_batch(request: BatchGenerateResumeRequest):
+    """Generates a new resume version for several applications, packing their prompts together where the provider allows."""
+    inputs = await asyncio.gather(*(asyncio.to_thread(_load_tailoring_inputs, app_id) for app_id in request.appIds))
+    return await _run_resume_batch(request, inputs)
+
+async def _run_resume_batch(request: BatchGenerateResumeRequest, inputs: List[tuple]) -> List[Dict[str, Any]]:
+    generated = await agent_resume_tailor_batch(
+        [(jd_text, fixed_resume_yaml) for _, fixed_resume_yaml, _, jd_text in inputs], request.modelProvider
+    )
+
+    results = []
+    for app_id, (app_path, _, fixed_resume_data, _), generated_data in zip(request.appIds, inputs, generated):
+        # Saved one at a time, since the same application may appear twice and versions are numbered from disk.
+        saved = await asyncio.to_thread(_save_tailored_resume, app_id, app_path, fixed_resume_data, generated_data)
+        results.append({"appId": app_id, **saved})
+    return results
+
+# Background batch jobs, keyed by job ID. Held in memory, so they don't survive a restart.
+batch_jobs: Dict[str, Dict[str, Any]] = {}
+# How long a finished job's results stay available to poll before they are dropped.
+BATCH_JOB_TTL_SECONDS = float(os.getenv("BATCH_JOB_TTL", str(24 * 3600)))
+
+def _prune_batch_jobs():
+    """Drops completed and failed jobs that finished more than BATCH_JOB_TTL_SECONDS ago."""
+    cutoff = datetime.now().timestamp() - BATCH_JOB_TTL_SECONDS
+    for job_id in [job_id for job_id, job in batch_jobs.items() if job.get("finishedAt", cutoff) < cutoff]:
+        del batch_jobs[job_id]
+
+async def _run_resume_batch_job(job_id: str, request: BatchGenerateResumeRequest, inputs: List[tuple]):
+    job = batch_jobs[job_id]
+    try:
+        job["results"] = await _run_resume_batch(request, inputs)
+        job["status"] = "completed"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = e.detail if isinstance(e, HTTPException) else str(e)
+    finally:
+        job["finishedAt"] = datetime.now().timestamp()
+        job.pop("task", None)
+
+@app.post("/batch-jobs/resumes", response_model=Dict[str, str], status_code=202)
+async def submit_resume_batch_job(request: BatchGenerateResumeRequest):
+    """
+    Queues generate-resume-batch as a background job for large offline runs (e.g. dozens of
+    applications overnight). Returns a job ID to poll at /batch-jobs/{job_id}.
+    """
+    _prune_batch_jobs()
+    inputs = await asyncio.gather(*(asyncio.to_thread(_load_tailoring_inputs, app_id) for app_id in request.appIds))
+    job_id = uuid.uuid4().hex
+    batch_jobs[job_id] = {"status": "running", "appIds": request.appIds, "createdAt": datetime.now().timestamp()}
+    # Keep a reference so the task isn't garbage collected while it runs.
+    batch_jobs[job_id]["task"] = asyncio.create_task(_run_resume_batch_job(job_id, request, inputs))
+    return {"jobId": job_id, "status": "running"}
+
+@app.get("/batch-jobs/{job_id}", response_model=Dict[str, Any])
+def get_batch_job(job_id: str):
+    _prune_batch_jobs()
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found.")
+    return {"jobId": job_id, **{k: v for k, v in job.items() if k != "task"}}
+
+@app.post("/applications/{app_id}/generate-resume-stream")
+async def generate_resume_stream(app_id: str, request: GenerateResumeRequest):
+    """
+    Server-sent events version of generate-resume: emits a `section` event as each
+    part of the resume is generated and a final `done` event with the saved version.
+    """
+    app_path, fixed_resume_yaml, fixed_resume_data, jd_text = await asyncio.to_thread(_load_tailoring_inputs, app_id)
+
+    async def event_stream():
+        generated_data = {}
+        try:
+            async for fragment in agent_resume_tailor_stream(jd_text, fixed_resume_yaml, request.modelProvider):
+                generated_data.update(fragment)
+                yield _sse(fragment, event="section")
+            saved = await asyncio.to_thread(_save_tailored_resume, app_id, app_path, fixed_resume_data, generated_data)
+            yield _sse(saved, event="done")
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield _sse({"detail": detail}, event="error")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.post("/applications/{app_id}/save-variables", response_model=Dict[str, str])
 def save_variables(app_id: str, request: SaveVariablesRequest):
-    app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
-    
-    vars_path = os.path.join(app_path, "custom_variables.yaml")
+    vars_path = resolve_app(app_id).join("custom_variables.yaml")
     try:
-        with open(vars_path, 'w', encoding='utf-8') as f:
-            yaml.dump(request.variables, f, allow_unicode=True, sort_keys=False)
+        write_text(vars_path, yaml.dump(request.variables, Dumper=YAML_DUMPER, allow_unicode=True, sort_keys=False))
         update_application_timestamp(app_id)
         return {"message": "Configuration saved successfully."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save configuration: {e}")
 
-@app.post("/applications/{app_id}/render-pdf")
-def render_pdf(app_id: str, data: RenderRequestData):
-    app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
-        
+def _pdf_response(pdf_bytes: bytes, filename: str) -> Response:
+    """Returns a PDF rendered in memory; previews are never read back, so they skip the disk."""
+    return Response(pdf_bytes, media_type='application/pdf', headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+async def _render_pdf_bytes(render, *args) -> bytes:
+    """Runs one of pdf_services' render_* functions in the PDF worker pool, or a thread if it's disabled."""
+    pool = getattr(app.state, "pdf_pool", None)
+    if pool is None:
+        return await asyncio.to_thread(render, *args)
+    return await asyncio.get_running_loop().run_in_executor(pool, render, *args)
+
+def _pdf_file_response(pdf_path: str, filename: str, missing_detail: str) -> FileResponse:
+    """Serves a saved PDF, reusing the existence check's stat so Starlette doesn't stat the file again."""
+    try:
+        stat_result = os.stat(pdf_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=missing_detail)
+    return FileResponse(pdf_path, media_type='application/pdf', filename=filename, stat_result=stat_result)
+
+def _load_render_inputs(app_id: str, data: RenderRequestData) -> Tuple[Dict, Dict]:
+    """Returns (resume_data, final_vars) for a resume preview."""
+    paths = resolve_app(app_id)
+
     try:
-        resume_data = yaml.safe_load(data.resumeYaml)
+        resume_data = yaml.load(data.resumeYaml, Loader=YAML_LOADER)
     except yaml.YAMLError:
         raise HTTPException(status_code=400, detail="Invalid YAML format in resume data.")
 
     final_vars = load_variables()
-    custom_vars_path = os.path.join(app_path, "custom_variables.yaml")
-    if os.path.exists(custom_vars_path):
-        with open(custom_vars_path, 'r', encoding='utf-8') as f:
-            app_specific_vars = yaml.safe_load(f)
-            final_vars = merge_variables(final_vars, app_specific_vars)
+    if "custom_variables.yaml" in paths.files:
+        # Cached until the file changes, so re-rendering while tweaking request variables skips the parse.
+        app_specific_vars = read_yaml_file(paths.join("custom_variables.yaml"))[1]
+        final_vars = merge_variables(final_vars, app_specific_vars)
 
     if data.variables:
         final_vars = merge_variables(final_vars, data.variables)
 
-    pdf_generator = ATSResumePDFGenerator(variables=final_vars)
-    
-    dummy_doc = SimpleDocTemplate(os.path.join(app_path, "dummy.pdf"), pagesize=letter, rightMargin=0.4*inch, leftMargin=0.4*inch, topMargin=0.4*inch, bottomMargin=0.4*inch)
-
-    trimmed_resume_data = pdf_generator.preprocess_data_for_fitting(resume_data, dummy_doc.width)
+    return resume_data, final_vars
 
-    pdf_path = os.path.join(app_path, "tailored_resume_preview.pdf")
-    pdf_generator.generate_pdf_from_data(trimmed_resume_data, pdf_path)
-    
-    if os.path.exists(os.path.join(app_path, "dummy.pdf")):
-        os.remove(os.path.join(app_path, "dummy.pdf"))
-
-    return FileResponse(pdf_path, media_type='application/pdf', filename=f"{app_id}_resume_preview.pdf")
+@app.post("/applications/{app_id}/render-pdf")
+async def render_pdf(app_id: str, data: RenderRequestData):
+    resume_data, final_vars = await asyncio.to_thread(_load_render_inputs, app_id, data)
+    from pdf_services import render_resume_pdf
+    pdf_bytes = await _render_pdf_bytes(render_resume_pdf, resume_data, final_vars)
+    return _pdf_response(pdf_bytes, f"{app_id}_resume_preview.pdf")
 
 @app.post("/applications/{app_id}/finalize", response_model=Dict[str, str])
 def finalize_resume(app_id: str, request: FinalizeRequest):
-    app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
+    app_path = resolve_app(app_id).path
 
     try:
-        original_data = yaml.safe_load(request.resumeYaml)
+        original_data = yaml.load(request.resumeYaml, Loader=YAML_LOADER)
     except yaml.YAMLError:
         raise HTTPException(status_code=400, detail="Invalid YAML format in request resume data.")
 
@@ -502,16 +777,15 @@ def finalize_resume(app_id: str, request: FinalizeRequest):
 
     final_yaml_path = os.path.join(app_path, "finalized_resume.yaml")
     with open(final_yaml_path, 'w', encoding='utf-8') as f:
-        yaml.dump(final_resume_data, f, sort_keys=False, allow_unicode=True)
+        yaml.dump(final_resume_data, f, Dumper=YAML_DUMPER, sort_keys=False, allow_unicode=True)
 
     try:
+        from pdf_services import ATSResumePDFGenerator, RESUME_FRAME_WIDTH
         pdf_generator = ATSResumePDFGenerator(variables=request.variables)
         
-        dummy_doc = SimpleDocTemplate(os.path.join(app_path, "dummy_for_width.pdf"), pagesize=letter, rightMargin=0.4*inch, leftMargin=0.4*inch, topMargin=0.4*inch, bottomMargin=0.4*inch)
-        
-        trimmed_resume_data = pdf_generator.preprocess_data_for_fitting(final_resume_data, dummy_doc.width)
+        trimmed_resume_data = pdf_generator.preprocess_data_for_fitting(final_resume_data, RESUME_FRAME_WIDTH)
 
-        safe_name = "".join(c if c.isalnum() else '_' for c in final_resume_data.get('name', ''))
+        safe_name = make_safe_name(final_resume_data.get('name', ''))
         final_pdf_name = f"Resume_{safe_name}.pdf"
         final_pdf_path = os.path.join(app_path, final_pdf_name)
 
@@ -521,32 +795,18 @@ def finalize_resume(app_id: str, request: FinalizeRequest):
             "name": safe_name,
             "finalizedBaseVersion": request.baseVersionFile
         })
-        
-        if os.path.exists(dummy_doc.filename):
-            os.remove(dummy_doc.filename)
 
         update_application_timestamp(app_id)
         return {"message": f"Successfully finalized resume as {final_pdf_name}."}
         
     except Exception as e:
-        dummy_path = os.path.join(app_path, "dummy_for_width.pdf")
-        if os.path.exists(dummy_path):
-            os.remove(dummy_path)
         raise HTTPException(status_code=500, detail=f"Failed to generate final PDF: {str(e)}")
 
 
 @app.get("/applications/{app_id}/finalized-pdf")
 def get_finalized_pdf(app_id: str):
     app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
-    
-    details_path = os.path.join(app_path, "app_details.json")
-    if not os.path.exists(details_path):
-        raise HTTPException(status_code=404, detail="Application details not found.")
-        
-    with open(details_path, 'r') as f:
-        details = json.load(f)
+    details = _read_app_details(app_path)
     
     safe_name = details.get("name")
     if not safe_name:
@@ -555,41 +815,43 @@ def get_finalized_pdf(app_id: str):
     pdf_filename = f"Resume_{safe_name}.pdf"
     pdf_path = os.path.join(app_path, pdf_filename)
 
-    if not os.path.exists(pdf_path):
-        raise HTTPException(status_code=404, detail="Finalized PDF not found.")
-        
-    return FileResponse(pdf_path, media_type='application/pdf', filename=pdf_filename)
+    return _pdf_file_response(pdf_path, pdf_filename, "Finalized PDF not found.")
 
 @app.post("/applications/{app_id}/save-email-details", response_model=Dict[str, str])
 def save_email_details(app_id: str, details: EmailDetails):
     app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
-    
-    update_app_details(app_path, details.dict())
+    _update_app_details_or_404(app_path, details.model_dump())
     update_application_timestamp(app_id)
     return {"message": "Email details saved."}
 
-@app.post("/applications/{app_id}/generate-email", response_model=Dict[str, str])
-def generate_email(app_id: str, request: EmailGenerationRequest):
-    app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
+def _load_email_inputs(app_id: str):
+    """Returns (app_path, app_details, jd_text, resume_yaml) for cold email generation."""
+    paths = resolve_app(app_id)
 
-    details_path = os.path.join(app_path, "app_details.json")
-    jd_path = os.path.join(app_path, "job_description.html")
-    resume_path = os.path.join(app_path, "finalized_resume.yaml")
+    if "app_details.json" not in paths.files: raise HTTPException(status_code=404, detail="Application details not found.")
+    if "job_description.html" not in paths.files: raise HTTPException(status_code=404, detail="Job description not found.")
+    if "finalized_resume.yaml" not in paths.files: raise HTTPException(status_code=404, detail="Finalized resume not found.")
+
+    app_details = read_json(paths.join("app_details.json"))
+    jd_text = _read_jd_text(paths.join("job_description.html"))
+    with open(paths.join("finalized_resume.yaml"), 'r', encoding='utf-8') as f: resume_yaml = f.read()
+
+    return paths.path, app_details, jd_text, resume_yaml
 
-    if not os.path.exists(details_path): raise HTTPException(status_code=404, detail="Application details not found.")
-    if not os.path.exists(jd_path): raise HTTPException(status_code=404, detail="Job description not found.")
-    if not os.path.exists(resume_path): raise HTTPException(status_code=404, detail="Finalized resume not found.")
+def _save_generated_email(app_id: str, app_path: str, request: EmailGenerationRequest, email_content: Dict):
+    details_to_save = request.model_dump(exclude={'modelProvider'})
+    details_to_save['generatedEmailSubject'] = email_content.get('subject')
+    details_to_save['generatedEmailBody'] = email_content.get('body')
+    
+    update_app_details(app_path, details_to_save)
+    update_application_timestamp(app_id)
 
-    with open(details_path, 'r') as f: app_details = json.load(f)
-    with open(jd_path, 'r', encoding='utf-8') as f: jd_text = BeautifulSoup(f.read(), 'html.parser').get_text(separator='\n', strip=True)
-    with open(resume_path, 'r', encoding='utf-8') as f: resume_yaml = f.read()
+@app.post("/applications/{app_id}/generate-email", response_model=Dict[str, str])
+async def generate_email(app_id: str, request: EmailGenerationRequest):
+    app_path, app_details, jd_text, resume_yaml = await asyncio.to_thread(_load_email_inputs, app_id)
 
     try:
-        email_content_str = agent_cold_email_generator(
+        email_content = await agent_cold_email_generator(
             company_name=app_details.get("companyName", ""),
             role_title=app_details.get("roleTitle", ""),
             recruiter_name=request.recruiterName,
@@ -599,93 +861,177 @@ def generate_email(app_id: str, request: EmailGenerationRequest):
             additional_details=request.additionalDetails,
             model_provider=request.modelProvider
         )
-        email_content = json.loads(email_content_str)
-        
-        details_to_save = request.dict(exclude={'modelProvider'})
-        details_to_save['generatedEmailSubject'] = email_content.get('subject')
-        details_to_save['generatedEmailBody'] = email_content.get('body')
-        
-        update_app_details(app_path, details_to_save)
-        update_application_timestamp(app_id)
+        await asyncio.to_thread(_save_generated_email, app_id, app_path, request, email_content)
         return email_content
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate email content: {e}")
-    
-@app.post("/applications/{app_id}/generate-cover-letter", response_model=Dict[str, str])
-def generate_cover_letter(app_id: str, request: CoverLetterGenerationRequest):
-    app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
 
-    jd_path = os.path.join(app_path, "job_description.html")
-    resume_path = os.path.join(app_path, "finalized_resume.yaml")
+@app.post("/applications/{app_id}/generate-email-stream")
+async def generate_email_stream(app_id: str, request: EmailGenerationRequest):
+    """
+    Server-sent events version of generate-email: emits `chunk` events with the raw
+    text as it is generated and a final `done` event with the parsed subject and body.
+    """
+    app_path, app_details, jd_text, resume_yaml = await asyncio.to_thread(_load_email_inputs, app_id)
+
+    async def event_stream():
+        try:
+            async for kind, payload in agent_cold_email_generator_stream(
+                company_name=app_details.get("companyName", ""),
+                role_title=app_details.get("roleTitle", ""),
+                recruiter_name=request.recruiterName,
+                recipient_linkedin_url=request.recruiterLinkedIn,
+                resume_yaml=resume_yaml,
+                jd_text=jd_text,
+                additional_details=request.additionalDetails,
+                model_provider=request.modelProvider
+            ):
+                if kind == "chunk":
+                    yield _sse({"text": payload}, event="chunk")
+                else:
+                    await asyncio.to_thread(_save_generated_email, app_id, app_path, request, payload)
+                    yield _sse(payload, event="done")
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield _sse({"detail": f"Failed to generate email content: {detail}"}, event="error")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    
+def _load_cover_letter_inputs(app_id: str):
+    """Returns (app_path, jd_text, resume_yaml) for cover letter generation."""
+    paths = resolve_app(app_id)
 
-    if not os.path.exists(jd_path): raise HTTPException(status_code=404, detail="Job description not found.")
-    if not os.path.exists(resume_path): raise HTTPException(status_code=404, detail="A finalized resume is required to generate a cover letter.")
+    if "job_description.html" not in paths.files: raise HTTPException(status_code=404, detail="Job description not found.")
+    if "finalized_resume.yaml" not in paths.files: raise HTTPException(status_code=404, detail="A finalized resume is required to generate a cover letter.")
 
-    with open(jd_path, 'r', encoding='utf-8') as f:
-        jd_text = BeautifulSoup(f.read(), 'html.parser').get_text(separator='\n', strip=True)
-    with open(resume_path, 'r', encoding='utf-8') as f:
+    jd_text = _read_jd_text(paths.join("job_description.html"))
+    with open(paths.join("finalized_resume.yaml"), 'r', encoding='utf-8') as f:
         resume_yaml = f.read()
-    
+
+    return paths.path, jd_text, resume_yaml
+
+def _save_generated_cover_letter(app_id: str, app_path: str, additional_details: str, body: str, contact_email: str):
+    update_app_details(app_path, {
+        "coverLetterAdditionalDetails": additional_details,
+        "generatedCoverLetterBody": body,
+        "selectedContactEmail": contact_email
+    })
+    update_application_timestamp(app_id)
+
+@app.post("/applications/{app_id}/generate-cover-letter", response_model=Dict[str, str])
+async def generate_cover_letter(app_id: str, request: CoverLetterGenerationRequest):
+    app_path, jd_text, resume_yaml = await asyncio.to_thread(_load_cover_letter_inputs, app_id)
+
     try:
-        cover_letter_str = agent_cover_letter_generator(
+        cover_letter_content = await agent_cover_letter_generator(
             resume_yaml=resume_yaml,
             jd_text=jd_text,
             additional_details=request.additionalDetails,
             model_provider=request.modelProvider
         )
-        cover_letter_content = json.loads(cover_letter_str)
         body = cover_letter_content.get("cover_letter_body", "")
-
-        update_app_details(app_path, {
-            "coverLetterAdditionalDetails": request.additionalDetails,
-            "generatedCoverLetterBody": body,
-            "selectedContactEmail": request.contactEmail
-        })
-        update_application_timestamp(app_id)
+        await asyncio.to_thread(_save_generated_cover_letter, app_id, app_path, request.additionalDetails, body, request.contactEmail)
         return {"cover_letter_body": body}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate cover letter: {str(e)}")
 
+@app.post("/applications/{app_id}/generate-cover-letter-stream")
+async def generate_cover_letter_stream(app_id: str, request: CoverLetterGenerationRequest):
+    """
+    Server-sent events version of generate-cover-letter: emits `chunk` events with the raw
+    text as it is generated and a final `done` event with the cover letter body.
+    """
+    app_path, jd_text, resume_yaml = await asyncio.to_thread(_load_cover_letter_inputs, app_id)
+
+    async def event_stream():
+        try:
+            async for kind, payload in agent_cover_letter_generator_stream(
+                resume_yaml=resume_yaml,
+                jd_text=jd_text,
+                additional_details=request.additionalDetails,
+                model_provider=request.modelProvider
+            ):
+                if kind == "chunk":
+                    yield _sse({"text": payload}, event="chunk")
+                else:
+                    body = payload.get("cover_letter_body", "")
+                    await asyncio.to_thread(_save_generated_cover_letter, app_id, app_path, request.additionalDetails, body, request.contactEmail)
+                    yield _sse({"cover_letter_body": body}, event="done")
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield _sse({"detail": f"Failed to generate cover letter: {detail}"}, event="error")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/applications/{app_id}/generate-all", response_model=Dict[str, Any])
+async def generate_all(app_id: str, request: FullPipelineRequest):
+    """
+    Generates a tailored resume version, cold email and cover letter in one go, running
+    the three agents concurrently. Requires a finalized resume for the email and letter.
+    """
+    app_path, fixed_resume_yaml, fixed_resume_data, jd_text = await asyncio.to_thread(_load_tailoring_inputs, app_id)
+    _, app_details, _, resume_yaml = await asyncio.to_thread(_load_email_inputs, app_id)
+
+    generated_data, email_content, cover_letter_content = await run_full_pipeline(
+        jd_text=jd_text,
+        fixed_resume_yaml=fixed_resume_yaml,
+        resume_yaml=resume_yaml,
+        company_name=app_details.get("companyName", ""),
+        role_title=app_details.get("roleTitle", ""),
+        recruiter_name=request.recruiterName,
+        recipient_linkedin_url=request.recruiterLinkedIn,
+        email_additional_details=request.additionalDetails,
+        cover_letter_additional_details=request.coverLetterAdditionalDetails,
+        model_provider=request.modelProvider
+    )
+
+    resume_result = await asyncio.to_thread(_save_tailored_resume, app_id, app_path, fixed_resume_data, generated_data)
+    email_request = EmailGenerationRequest(
+        recruiterName=request.recruiterName,
+        recruiterEmail=request.recruiterEmail,
+        recruiterLinkedIn=request.recruiterLinkedIn,
+        additionalDetails=request.additionalDetails,
+        modelProvider=request.modelProvider
+    )
+    # Both update app_details.json, so they run one after the other.
+    await asyncio.to_thread(_save_generated_email, app_id, app_path, email_request, email_content)
+    body = cover_letter_content.get("cover_letter_body", "")
+    await asyncio.to_thread(_save_generated_cover_letter, app_id, app_path, request.coverLetterAdditionalDetails, body, request.contactEmail)
+
+    return {"resume": resume_result, "email": email_content, "coverLetter": {"cover_letter_body": body}}
+
 @app.post("/applications/{app_id}/save-cover-letter-details", response_model=Dict[str, str])
 def save_cover_letter_details(app_id: str, details: CoverLetterDetails):
     app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
-    
-    update_app_details(app_path, {
+    _update_app_details_or_404(app_path, {
         "coverLetterAdditionalDetails": details.additionalDetails,
         "selectedContactEmail": details.contactEmail
     })
     update_application_timestamp(app_id)
     return {"message": "Cover letter details saved."}
 
+def _load_cover_letter_preview_inputs(app_id: str) -> Tuple[Dict, Dict]:
+    """Returns (base_resume_data, variables) for a cover letter preview."""
+    resolve_app(app_id)
+    _, base_resume_data = load_base_resume()
+    return base_resume_data, load_variables()
+
 @app.post("/applications/{app_id}/render-cover-letter-preview")
-def render_cover_letter_preview(app_id: str, request: CoverLetterPreviewRequest):
-    app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
+async def render_cover_letter_preview(app_id: str, request: CoverLetterPreviewRequest):
+    base_resume_data, variables = await asyncio.to_thread(_load_cover_letter_preview_inputs, app_id)
 
     try:
-        with open(BASE_RESUME_PATH, 'r', encoding='utf-8') as f:
-            base_resume_data = yaml.safe_load(f)
-
         contact_info = base_resume_data.get('contact', {}).copy()
         if request.contactEmail:
             contact_info['email'] = request.contactEmail
         
         candidate_name = base_resume_data.get('name', 'Candidate')
         
-        variables = load_variables()
-        pdf_generator = CoverLetterPDFGenerator(variables=variables)
-        
-        preview_pdf_path = os.path.join(app_path, "cover_letter_preview.pdf")
-        
-        pdf_generator.generate_pdf(request.coverLetterText, contact_info, preview_pdf_path, candidate_name)
+        from pdf_services import render_cover_letter_pdf
+        pdf_bytes = await _render_pdf_bytes(render_cover_letter_pdf, request.coverLetterText, contact_info, candidate_name, variables)
 
-        return FileResponse(preview_pdf_path, media_type='application/pdf', filename=f"{app_id}_cover_letter_preview.pdf")
+        return _pdf_response(pdf_bytes, f"{app_id}_cover_letter_preview.pdf")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to render cover letter preview: {str(e)}")
@@ -697,22 +1043,19 @@ def save_cover_letter(app_id: str, request: SaveCoverLetterRequest):
         raise HTTPException(status_code=404, detail="Application not found.")
     
     try:
-        with open(BASE_RESUME_PATH, 'r', encoding='utf-8') as f:
-            base_resume_data = yaml.safe_load(f)
+        _, base_resume_data = load_base_resume()
         
-        details_path = os.path.join(app_path, "app_details.json")
-        selected_email = ""
-        if os.path.exists(details_path):
-            with open(details_path, 'r') as f:
-                details = json.load(f)
-                selected_email = details.get("selectedContactEmail", "")
+        try:
+            selected_email = read_json(os.path.join(app_path, "app_details.json")).get("selectedContactEmail", "")
+        except FileNotFoundError:
+            selected_email = ""
         
         contact_info = base_resume_data.get('contact', {}).copy()
         if selected_email:
             contact_info['email'] = selected_email
         
         candidate_name = base_resume_data.get('name', 'Candidate')
-        safe_name = "".join(c if c.isalnum() else '_' for c in candidate_name)
+        safe_name = make_safe_name(candidate_name)
         
         final_pdf_name = f"CoverLetter_{safe_name}.pdf"
         pdf_path = os.path.join(app_path, final_pdf_name)
@@ -723,6 +1066,7 @@ def save_cover_letter(app_id: str, request: SaveCoverLetterRequest):
         })
 
         variables = load_variables()
+        from pdf_services import CoverLetterPDFGenerator
         pdf_generator = CoverLetterPDFGenerator(variables=variables)
         pdf_generator.generate_pdf(request.coverLetterText, contact_info, pdf_path, candidate_name)
         update_application_timestamp(app_id)
@@ -733,15 +1077,7 @@ def save_cover_letter(app_id: str, request: SaveCoverLetterRequest):
 @app.get("/applications/{app_id}/cover-letter-pdf")
 def get_cover_letter_pdf(app_id: str):
     app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    if not os.path.isdir(app_path):
-        raise HTTPException(status_code=404, detail="Application not found.")
-    
-    details_path = os.path.join(app_path, "app_details.json")
-    if not os.path.exists(details_path):
-        raise HTTPException(status_code=404, detail="Application details not found.")
-        
-    with open(details_path, 'r') as f:
-        details = json.load(f)
+    details = _read_app_details(app_path)
     
     pdf_filename = details.get("finalizedCoverLetterFile")
     if not pdf_filename:
@@ -749,20 +1085,12 @@ def get_cover_letter_pdf(app_id: str):
 
     pdf_path = os.path.join(app_path, pdf_filename)
 
-    if not os.path.exists(pdf_path):
-        raise HTTPException(status_code=404, detail="Cover Letter PDF file not found on disk.")
-        
-    return FileResponse(pdf_path, media_type='application/pdf', filename=pdf_filename)
+    return _pdf_file_response(pdf_path, pdf_filename, "Cover Letter PDF file not found on disk.")
 
 @app.post("/applications/{app_id}/track-application", response_model=TrackerApplicationItem)
 def track_application(app_id: str):
     app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    details_path = os.path.join(app_path, "app_details.json")
-    if not os.path.exists(details_path):
-        raise HTTPException(status_code=404, detail="Application details not found.")
-
-    with open(details_path, 'r') as f:
-        details = json.load(f)
+    details = _read_app_details(app_path)
 
     finalized_resume_path = os.path.join(app_path, "finalized_resume.yaml")
     status = "Ready to Apply" if os.path.exists(finalized_resume_path) else "To Apply"
@@ -789,7 +1117,7 @@ def track_application(app_id: str):
             jobLink=jobLink,
             status=status
         )
-        apps.insert(0, new_app_item.dict())
+        apps.insert(0, new_app_item.model_dump())
         write_tracker_data(TRACKER_APPS_PATH, apps)
         return new_app_item
 
@@ -813,23 +1141,22 @@ def add_tracker_application(item: TrackerApplicationItem):
     if not os.path.exists(app_path):
         os.makedirs(app_path)
         details_path = os.path.join(app_path, "app_details.json")
-        with open(details_path, 'w') as f:
-            json.dump({
-                "companyName": item.company,
-                "roleTitle": item.role,
-                "jobId": item.jobId,
-                "jobLink": item.jobLink
-            }, f, indent=2)
+        write_json(details_path, {
+            "companyName": item.company,
+            "roleTitle": item.role,
+            "jobId": item.jobId,
+            "jobLink": item.jobLink
+        })
 
     existing_item = next((app for app in apps if app.get("company") == item.company and app.get("role") == item.role and app.get("jobId") == item.jobId), None)
 
     if existing_item:
-        for key, value in item.dict(exclude_unset=True).items():
+        for key, value in item.model_dump(exclude_unset=True).items():
             existing_item[key] = value
         write_tracker_data(TRACKER_APPS_PATH, apps)
         return existing_item
     else:
-        apps.insert(0, item.dict())
+        apps.insert(0, item.model_dump())
         write_tracker_data(TRACKER_APPS_PATH, apps)
         return item
 
@@ -841,7 +1168,7 @@ def update_tracker_application(item_id: str, updated_item: TrackerApplicationIte
         raise HTTPException(status_code=404, detail="Application item not found")
     
     original_created_at = apps[index].get("createdAt", datetime.now().isoformat())
-    item_dict = updated_item.dict(exclude_unset=True)
+    item_dict = updated_item.model_dump(exclude_unset=True)
     
     apps[index].update(item_dict)
     apps[index]["createdAt"] = original_created_at
@@ -882,12 +1209,7 @@ def get_tracker_emails():
 @app.post("/applications/{app_id}/track-email", response_model=TrackerEmailItem)
 def track_email(app_id: str, request: TrackEmailRequest):
     app_path = os.path.join(APPLICATIONS_DIR, app_id)
-    details_path = os.path.join(app_path, "app_details.json")
-    if not os.path.exists(details_path):
-        raise HTTPException(status_code=404, detail="Application details not found.")
-    
-    with open(details_path, 'r') as f:
-        details = json.load(f)
+    details = _read_app_details(app_path)
 
     emails = read_tracker_data(TRACKER_EMAILS_PATH)
     
@@ -921,7 +1243,7 @@ def track_email(app_id: str, request: TrackEmailRequest):
             status="Sent",
             jobLink=jobLink
         )
-        emails.insert(0, new_email_item.dict())
+        emails.insert(0, new_email_item.model_dump())
         write_tracker_data(TRACKER_EMAILS_PATH, emails)
         return new_email_item
 
@@ -933,7 +1255,7 @@ def update_tracker_email(item_id: str, updated_item: TrackerEmailItem):
         raise HTTPException(status_code=404, detail="Email item not found")
     
     original_created_at = emails[index].get("createdAt", datetime.now().isoformat())
-    item_dict = updated_item.dict()
+    item_dict = updated_item.model_dump()
     item_dict["createdAt"] = original_created_at
     item_dict["id"] = item_id
 
@@ -1,15 +1,22 @@
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, HRFlowable, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from typing import Dict, List, Tuple
+from typing import BinaryIO, Dict, List, Tuple, Union
+import io
 import math
 import copy
 import re
+import json
+import functools
+
+RESUME_MARGIN = 0.4*inch
+# Width of the resume's text frame, which is what skill lines are trimmed to fit.
+RESUME_FRAME_WIDTH = letter[0] - RESUME_MARGIN - RESUME_MARGIN # Same arithmetic as SimpleDocTemplate.width
 
 ALIGNMENT_MAP = {
     "left": TA_LEFT,
@@ -17,43 +24,62 @@ ALIGNMENT_MAP = {
     "right": TA_RIGHT
 }
 
+# Font registration and stylesheets are built once per distinct configuration and
+# shared between renders; the generators only read from them.
+@functools.lru_cache(maxsize=None)
+def _register_font_family(base_font_name: str):
+    try:
+        if base_font_name == 'Helvetica':
+            pdfmetrics.registerFontFamily('Helvetica', normal='Helvetica', bold='Helvetica-Bold', italic='Helvetica-Oblique', boldItalic='Helvetica-BoldOblique')
+        elif base_font_name == 'Times-Roman':
+            pdfmetrics.registerFontFamily('Times-Roman', normal='Times-Roman', bold='Times-Bold', italic='Times-Italic', boldItalic='Times-BoldItalic')
+        elif base_font_name == 'Courier':
+            pdfmetrics.registerFontFamily('Courier', normal='Courier', bold='Courier-Bold', italic='Courier-Oblique', boldItalic='Courier-BoldOblique')
+    except Exception as e:
+        print(f"Could not register font family {base_font_name}: {e}")
+
+@functools.lru_cache(maxsize=32)
+def _resume_stylesheet(base_font: str, style_vars_json: str) -> StyleSheet1:
+    """Keyed on the style variables serialized to JSON, since the dicts themselves aren't hashable."""
+    styles = getSampleStyleSheet()
+    for name, properties in json.loads(style_vars_json).items():
+        alignment = ALIGNMENT_MAP.get(str(properties.get("alignment", "left")).lower(), TA_LEFT)
+        font_name = properties.get("fontName", base_font)
+        styles.add(ParagraphStyle(
+            name=name.capitalize(),
+            parent=styles['Normal'],
+            fontName=font_name,
+            fontSize=properties.get("fontsize", 10),
+            spaceAfter=properties.get("spaceAfter", 2),
+            spaceBefore=properties.get("spaceBefore", 2),
+            leftIndent=properties.get("leftIndent", 0),
+            bulletIndent=properties.get("bulletIndent", 0),
+            alignment=alignment,
+            leading=properties.get("fontsize", 10) * 1.2
+        ))
+    return styles
+
+@functools.lru_cache(maxsize=None)
+def _cover_letter_stylesheet(base_font: str) -> StyleSheet1:
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='CoverLetterBody', parent=styles['Normal'], fontName=base_font, fontSize=11, leading=14, spaceAfter=12))
+    styles.add(ParagraphStyle(name='Signature', parent=styles['Normal'], fontName=base_font, fontSize=11, leading=14, spaceAfter=4))
+    return styles
+
 class ATSResumePDFGenerator:
     def __init__(self, variables: Dict):
         self.vars = variables
-        self.styles = getSampleStyleSheet()
         self.base_font = self.vars.get("font_settings", {}).get("base_font_name", "Helvetica")
         
         self.register_font_family(self.base_font)
         self.setup_custom_styles()
 
     def register_font_family(self, base_font_name: str):
-        try:
-            if base_font_name == 'Helvetica':
-                pdfmetrics.registerFontFamily('Helvetica', normal='Helvetica', bold='Helvetica-Bold', italic='Helvetica-Oblique', boldItalic='Helvetica-BoldOblique')
-            elif base_font_name == 'Times-Roman':
-                pdfmetrics.registerFontFamily('Times-Roman', normal='Times-Roman', bold='Times-Bold', italic='Times-Italic', boldItalic='Times-BoldItalic')
-            elif base_font_name == 'Courier':
-                pdfmetrics.registerFontFamily('Courier', normal='Courier', bold='Courier-Bold', italic='Courier-Oblique', boldItalic='Courier-BoldOblique')
-        except Exception as e:
-            print(f"Could not register font family {base_font_name}: {e}")
+        _register_font_family(base_font_name)
 
     def setup_custom_styles(self):
         style_vars = self.vars.get("styles", {})
-        for name, properties in style_vars.items():
-            alignment = ALIGNMENT_MAP.get(str(properties.get("alignment", "left")).lower(), TA_LEFT)
-            font_name = properties.get("fontName", self.base_font)
-            self.styles.add(ParagraphStyle(
-                name=name.capitalize(),
-                parent=self.styles['Normal'],
-                fontName=font_name,
-                fontSize=properties.get("fontsize", 10),
-                spaceAfter=properties.get("spaceAfter", 2),
-                spaceBefore=properties.get("spaceBefore", 2),
-                leftIndent=properties.get("leftIndent", 0),
-                bulletIndent=properties.get("bulletIndent", 0),
-                alignment=alignment,
-                leading=properties.get("fontsize", 10) * 1.2
-            ))
+        self.styles = _resume_stylesheet(self.base_font, json.dumps(style_vars, sort_keys=True))
 
     def create_contact_info(self, contact_data):
         parts = []
@@ -123,8 +149,8 @@ class ATSResumePDFGenerator:
         
         return processed_data
 
-    def generate_pdf_from_data(self, data: Dict, output_file: str):
-        doc = SimpleDocTemplate(output_file, pagesize=letter, rightMargin=0.4*inch, leftMargin=0.4*inch, topMargin=0.4*inch, bottomMargin=0.4*inch)
+    def generate_pdf_from_data(self, data: Dict, output_file: Union[str, BinaryIO]):
+        doc = SimpleDocTemplate(output_file, pagesize=letter, rightMargin=RESUME_MARGIN, leftMargin=RESUME_MARGIN, topMargin=RESUME_MARGIN, bottomMargin=RESUME_MARGIN)
         story = []
         
         v_spaces = self.vars.get("spaces", {}).get("vertical", {})
@@ -192,33 +218,24 @@ class ATSResumePDFGenerator:
                     for desc_bullet in cert['description']: story.append(Paragraph(desc_bullet, self.styles['Bulleted_list'], bulletText='-'))
 
         doc.build(story)
-        print(f"ATS-optimized resume generated: {output_file}")
+        if isinstance(output_file, str):
+            print(f"ATS-optimized resume generated: {output_file}")
 
 class CoverLetterPDFGenerator:
     def __init__(self, variables: Dict):
         self.vars = variables
-        self.styles = getSampleStyleSheet()
         self.base_font = self.vars.get("font_settings", {}).get("base_font_name", "Helvetica")
         
         self.register_font_family(self.base_font)
         self.setup_custom_styles()
 
     def register_font_family(self, base_font_name: str):
-        try:
-            if base_font_name == 'Helvetica':
-                pdfmetrics.registerFontFamily('Helvetica', normal='Helvetica', bold='Helvetica-Bold', italic='Helvetica-Oblique', boldItalic='Helvetica-BoldOblique')
-            elif base_font_name == 'Times-Roman':
-                pdfmetrics.registerFontFamily('Times-Roman', normal='Times-Roman', bold='Times-Bold', italic='Times-Italic', boldItalic='Times-BoldItalic')
-            elif base_font_name == 'Courier':
-                pdfmetrics.registerFontFamily('Courier', normal='Courier', bold='Courier-Bold', italic='Courier-Oblique', boldItalic='Courier-BoldOblique')
-        except Exception as e:
-            print(f"Could not register font family {base_font_name}: {e}")
+        _register_font_family(base_font_name)
 
     def setup_custom_styles(self):
-        self.styles.add(ParagraphStyle(name='CoverLetterBody', parent=self.styles['Normal'], fontName=self.base_font, fontSize=11, leading=14, spaceAfter=12))
-        self.styles.add(ParagraphStyle(name='Signature', parent=self.styles['Normal'], fontName=self.base_font, fontSize=11, leading=14, spaceAfter=4))
+        self.styles = _cover_letter_stylesheet(self.base_font)
 
-    def generate_pdf(self, body_text: str, contact_info: Dict, output_file: str, candidate_name: str):
+    def generate_pdf(self, body_text: str, contact_info: Dict, output_file: Union[str, BinaryIO], candidate_name: str):
         doc = SimpleDocTemplate(output_file, pagesize=letter, rightMargin=inch, leftMargin=inch, topMargin=inch, bottomMargin=inch)
         story = []
         
@@ -250,4 +267,19 @@ class CoverLetterPDFGenerator:
             story.append(Paragraph(social_line, self.styles['Signature']))
 
         doc.build(story)
-        print(f"Cover letter generated: {output_file}")
+        if isinstance(output_file, str):
+            print(f"Cover letter generated: {output_file}")
+
+# --- Worker Entry Points ---
+# Module-level so a process pool can pickle them; each returns the finished PDF as bytes.
+def render_resume_pdf(resume_data: Dict, variables: Dict) -> bytes:
+    pdf_generator = ATSResumePDFGenerator(variables=variables)
+    trimmed_resume_data = pdf_generator.preprocess_data_for_fitting(resume_data, RESUME_FRAME_WIDTH)
+    pdf_buffer = io.BytesIO()
+    pdf_generator.generate_pdf_from_data(trimmed_resume_data, pdf_buffer)
+    return pdf_buffer.getvalue()
+
+def render_cover_letter_pdf(body_text: str, contact_info: Dict, candidate_name: str, variables: Dict) -> bytes:
+    pdf_buffer = io.BytesIO()
+    CoverLetterPDFGenerator(variables=variables).generate_pdf(body_text, contact_info, pdf_buffer, candidate_name)
+    return pdf_buffer.getvalue()
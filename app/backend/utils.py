@@ -1,7 +1,9 @@
 import os
+import re
 import yaml
 import copy
-from typing import Dict, Optional
+import functools
+from typing import Any, Dict, Optional, Tuple
 
 # --- Constants ---
 APPLICATIONS_DIR = "/app/applications"
@@ -9,21 +11,51 @@ APPLICATIONS_DIR = "/app/applications"
 BASE_RESUME_PATH = "/app/base_resume_fixed.yaml"
 VARIABLES_PATH = "/app/variables.yaml"
 
+# libyaml's C loader and dumper when PyYAML was built against it, the pure-Python ones otherwise.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# \W is everything except letters, digits and underscore, so substituting it with '_'
+# matches the old per-character isalnum() loop in a single C-level pass.
+_UNSAFE_NAME_RE = re.compile(r'\W')
+
 # --- Helper Functions ---
+def make_safe_name(text: str) -> str:
+    """Replaces every character that isn't a letter or digit with an underscore."""
+    return _UNSAFE_NAME_RE.sub('_', text)
+
 def get_app_id(company_name: str, role_title: str, job_id: Optional[str] = None) -> str:
     """Creates a safe directory name from company, role, and optional job ID."""
-    safe_company = "".join(c if c.isalnum() else '_' for c in company_name)
-    safe_role = "".join(c if c.isalnum() else '_' for c in role_title)
+    safe_company = make_safe_name(company_name)
+    safe_role = make_safe_name(role_title)
     if job_id:
-        safe_job_id = "".join(c if c.isalnum() else '_' for c in job_id)
+        safe_job_id = make_safe_name(job_id)
         return f"{safe_company}_{safe_role}_{safe_job_id}"
     return f"{safe_company}_{safe_role}"
 
+@functools.lru_cache(maxsize=128) # The base resume, variables.yaml and each application's custom variables
+def _read_yaml_file(path: str, mtime_ns: int, size: int) -> Tuple[str, Any]:
+    """Reads and parses a YAML file once per modification time and size; both are only part of the cache key."""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    return text, yaml.load(text, Loader=YAML_LOADER)
+
+def read_yaml_file(path: str) -> Tuple[str, Any]:
+    """
+    Returns the raw text and parsed data of a YAML file, re-reading it only after it changes.
+    The parsed data is shared between callers, so it must not be modified in place.
+    """
+    stat = os.stat(path)
+    return _read_yaml_file(path, stat.st_mtime_ns, stat.st_size)
+
+def load_base_resume() -> Tuple[str, Dict]:
+    """Returns the base resume's YAML text and parsed data."""
+    return read_yaml_file(BASE_RESUME_PATH)
+
 def load_variables() -> Dict:
-    """Loads formatting variables from the YAML file."""
+    """Loads formatting variables from the YAML file. The result is shared and must not be modified in place."""
     try:
-        with open(VARIABLES_PATH, 'r') as f:
-            return yaml.safe_load(f)
+        return read_yaml_file(VARIABLES_PATH)[1]
     except (FileNotFoundError, yaml.YAMLError):
         print("Warning: variables.yaml not found or is invalid. Using fallback defaults.")
         return {
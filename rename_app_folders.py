@@ -5,18 +5,25 @@ based on the app_details.json file in each folder.
 """
 
 import os
+import re
 import json
 import shutil
 from pathlib import Path
 from typing import Optional
 
+_UNSAFE_NAME_RE = re.compile(r'\W')
+
+def make_safe_name(text: str) -> str:
+    """Replaces every character that isn't a letter or digit with an underscore."""
+    return _UNSAFE_NAME_RE.sub('_', text)
+
 def get_app_id(company_name: str, role_title: str, job_id: Optional[str] = None) -> str:
     """Creates a safe directory name from company, role, and optional job ID.
     This function matches exactly the logic in app/backend/utils.py"""
-    safe_company = "".join(c if c.isalnum() else '_' for c in company_name)
-    safe_role = "".join(c if c.isalnum() else '_' for c in role_title)
+    safe_company = make_safe_name(company_name)
+    safe_role = make_safe_name(role_title)
     if job_id:
-        safe_job_id = "".join(c if c.isalnum() else '_' for c in job_id)
+        safe_job_id = make_safe_name(job_id)
         return f"{safe_company}_{safe_role}_{safe_job_id}"
     return f"{safe_company}_{safe_role}"
 